@@ -1,19 +1,46 @@
 #!/usr/bin/env python
-import os
+import argparse
 
-import finance.categorize as c
-import finance.parser as p
-import finance.report as r
-import finance.validate as v
-import finance.functions as f
+import finance
 
-year = 2023
-r.get_balance(year)
-# f.copy_cash_file(year)
-df_cat = c.parse_categories_from_transactions(year)
-df = p.parse_transactions(year)
-df = c.match_existing_categories(df, df_cat, year)
-v.check_monthly_balances(df, year)
-df, df_sum = r.summarize_months(year, df)
-r.save_results(df=df, df_sum=df_sum, f_path=f"./data/2023/output/summary.xlsx")
-r.get_pnl(year, df)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse, categorize and summarize transactions")
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--watch", action="store_true", help="re-run affected stages when files change")
+    parser.add_argument("--force", action="store_true", help="re-run stages with unchanged inputs too")
+    parser.add_argument("--list-files", action="store_true", help="list input files and exit")
+    parser.add_argument("--check-settings", action="store_true", help="validate settings files and exit")
+    parser.add_argument("--preview", action="store_true", help="show transactions changed by edited categories and exit")
+    parser.add_argument("--serve", metavar="ADDRESS", help="serve queries on host:port or a unix socket path")
+    parser.add_argument("--cache-stats", action="store_true", help="print cache hits, misses & evictions at the end")
+    parser.add_argument("--quiet", action="store_true", help="don't print report tables")
+    parser.add_argument("--report", metavar="FILE", help="append report tables to FILE (.md, .html or text)")
+    args = parser.parse_args()
+
+    year = args.year
+    finance.table.QUIET = args.quiet
+    finance.table.REPORT_PATH = args.report
+    # finance.functions.copy_cash_file(year)
+    # lightweight commands don't import pandas
+    if args.list_files:
+        for transaction_file in sorted(finance.functions.get_transaction_files(year)):
+            print(transaction_file)
+    elif args.check_settings:
+        finance.validate.check_settings(year)
+        print("Settings OK")
+    elif args.preview:
+        finance.categorize.preview_year(year)
+    elif args.serve:
+        finance.session.serve(year, args.serve)
+    elif args.watch:
+        finance.watch.Watcher(year).run()
+    else:
+        finance.dag.DAG(year, finance.pipeline.STAGES, preload=finance.pipeline.PRELOAD).run(force=args.force)
+    if args.cache_stats:
+        finance.cache.show_stats()
+
+
+# worker processes (spawn) import this file again without running it
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# Details index on synthetic transactions: build, incremental update & reload
+# time, query latency vs. a str.contains scan, and categorizer matching with
+# the index (candidates only) vs. the pattern matcher (every row).
+#
+#   PYTHONPATH=. python benchmarks/details_index.py [--rows 100000] [--patterns 300]
+import argparse
+import os
+import os.path
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+import finance.categorize as c
+import finance.index as ix
+
+
+def get_details(rows: int, words: list, rng: random.Random) -> list:
+    return [f"2023-01-{rng.randint(10, 28)} " + " ".join(rng.choice(words) for _ in range(5)) for _ in range(rows)]
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def query_us(function, queries: list) -> float:
+    # mean latency in microseconds
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--patterns", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = [f"Shop{i}" for i in range(3000)]
+    details = get_details(args.rows, words, rng)
+    new_details = get_details(args.rows // 10, words, rng)
+
+    index, build = timed(ix.TokenIndex, details)
+    _, update = timed(index.update, details + new_details)
+    f_path = os.path.join(tempfile.mkdtemp(), "transactions.index.npz")
+    _, save = timed(index.save, f_path)
+    _, load = timed(ix.TokenIndex.load, f_path)
+    os.remove(f_path)
+    print(f"build {args.rows} rows      {build * 1000:10.1f} ms")
+    print(f"update +{len(new_details)} rows     {update * 1000:10.1f} ms")
+    print(f"save / load            {save * 1000:10.1f} ms / {load * 1000:.1f} ms")
+
+    series = pd.Series(details + new_details)
+    queries = rng.sample(words, 100)
+    scan = query_us(lambda query: series.index[series.str.contains(query, regex=False)], queries[:10])
+    print(f"str.contains           {scan:10.1f} us")
+    print(f"index.search           {query_us(index.search, queries):10.1f} us")
+    print(f"index.search_token     {query_us(index.search_token, queries):10.1f} us")
+
+    patterns = rng.sample(words, args.patterns)
+    df = pd.DataFrame({"Details": series})
+    df_cat = pd.DataFrame({
+        "Pattern": patterns,
+        "PatternType": "Word",
+        "Priority": [rng.randint(1, 3) for _ in patterns],
+        "CategoryName": [rng.choice("ABCD") for _ in patterns],
+    })
+    full, full_time = timed(c.get_match_index, df, df_cat, 1)
+    pruned, pruned_time = timed(lambda: c.get_match_index(df, df_cat, token_index=index))
+    assert (full.winners == pruned.winners).all()
+    print(f"match {args.patterns} patterns    {full_time * 1000:10.1f} ms -> {pruned_time * 1000:.1f} ms (index)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# Time and peak memory of the transactions.xlsx export: df.to_excel (whole
+# workbook in memory) vs. store.save_excel (write-only, streamed in chunks).
+#
+#   PYTHONPATH=. python benchmarks/export_xlsx.py [--rows 10000 100000 1000000]
+import argparse
+import datetime as dt
+import os
+import os.path
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import finance.store as st
+
+
+def get_transactions(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    dates = [dt.date(2023, 1, 1) + dt.timedelta(days=int(day)) for day in rng.integers(0, 365, rows)]
+    return pd.DataFrame({
+        "Date": dates,
+        "Account": rng.choice(["HSBC_Checking", "Wise", "Cash"], rows),
+        "Amount": rng.normal(0, 100, rows).round(2),
+        "Currency": rng.choice(["USD", "HUF"], rows),
+        "Priority": rng.integers(1, 5, rows),
+        "Comment": np.nan,
+        "CategoryType": rng.choice(["Expense", "Income"], rows),
+        "CategoryName": rng.choice(["Groceries", "Rent", "Salary"], rows),
+        "Details": [f"{date} Transaction {i}" for i, date in enumerate(dates)],
+    })
+
+
+def measure(function) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}{'to_excel s':>12}{'MB':>8}{'save_excel s':>14}{'MB':>8}{'us/row':>8}")
+    with tempfile.TemporaryDirectory() as folder:
+        f_path = os.path.join(folder, "transactions.xlsx")
+        for rows in args.rows:
+            df = get_transactions(rows)
+            before = measure(lambda: df.to_excel(f_path, index=False))
+            after = measure(lambda: st.save_excel(df, f_path))
+            print(
+                f"{rows:>9}{before[0]:>12.1f}{before[1]:>8.0f}"
+                f"{after[0]:>14.1f}{after[1]:>8.0f}{after[0] / rows * 1e6:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
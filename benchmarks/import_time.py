@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# Import time of the finance modules and startup time of the lightweight
+# app.py commands, each measured in a fresh interpreter.
+#
+#   python benchmarks/import_time.py [--runs 5]
+import argparse
+import os
+import os.path
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["functions", "dataframe", "validate", "parser", "matcher", "categorize", "report", "pipeline", "watch"]
+HEAVY = ["numpy", "pandas", "openpyxl"]
+
+
+def run(command: list, runs: int) -> float:
+    # best of `runs` wall times in ms
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def get_loaded(module: str) -> list:
+    code = f"import sys, finance.{module}; print(','.join(m for m in {HEAVY} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    return [m for m in output.stdout.strip().split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = run([sys.executable, "-c", "pass"], args.runs)
+    print(f"{'interpreter':<28}{baseline:8.1f} ms")
+    for module in MODULES:
+        ms = run([sys.executable, "-c", f"import finance.{module}"], args.runs)
+        loaded = ", ".join(get_loaded(module)) or "-"
+        print(f"{'import finance.' + module:<28}{ms:8.1f} ms   heavy: {loaded}")
+    for name in HEAVY:
+        ms = run([sys.executable, "-c", f"import {name}"], args.runs)
+        print(f"{'import ' + name:<28}{ms:8.1f} ms")
+    for option in ["--list-files", "--check-settings"]:
+        ms = run([sys.executable, "app.py", option], args.runs)
+        print(f"{'app.py ' + option:<28}{ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
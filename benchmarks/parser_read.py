@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Time and memory of Parser.read + transform per bank format, reading every
+# column (before) vs. the parser's read_columns plan (after). Input files are
+# tiled to --rows rows in a temporary folder so the formats are comparable.
+#
+#   PYTHONPATH=. python benchmarks/parser_read.py [--year 2023] [--rows 100000] [--runs 3]
+import argparse
+import os
+import os.path
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import finance.functions as f
+import finance.parser as p
+
+
+def tile_file(src: str, dst: str, rows: int):
+    if src.endswith(".csv"):
+        with open(src, "r", encoding="utf-8") as file:
+            header, *lines = file.read().splitlines()
+        lines = [line for line in lines if line.strip()]
+        with open(dst, "w", encoding="utf-8") as file:
+            file.write("\n".join([header] + [lines[i % len(lines)] for i in range(rows)]) + "\n")
+    else:
+        df = pd.read_excel(src)
+        df = df.iloc[[i % len(df.index) for i in range(rows)]]
+        df.to_excel(dst, index=False)
+
+
+def read_all(parser: p.Parser) -> pd.DataFrame:
+    # previous behaviour: read every column, rename with df.rename copies
+    read_columns = parser.read_columns
+    parser.read_columns = None
+    try:
+        df = parser.read()
+    finally:
+        parser.read_columns = read_columns
+    if read_columns is not None:
+        df = df.rename(columns=read_columns)
+    return df
+
+
+def measure(parser: p.Parser, read, runs: int) -> tuple:
+    # best time (ms), peak traced memory (MB) & frame size after read (MB)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        parser.transform(read(parser))
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    df = read(parser)
+    size = df.memory_usage(deep=True).sum() / 2 ** 20
+    parser.transform(df)
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return min(times), peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        input_folder = os.path.join(folder, "data", str(args.year), "input")
+        os.makedirs(input_folder)
+        print(f"{'file':<24}{'columns':>9}{'time ms':>18}{'peak MB':>18}{'frame MB':>18}")
+        for file_name in sorted(f.get_transaction_files(args.year)):
+            if file_name.startswith(".~lock"):
+                continue
+            src = f.get_path(args.year, "input", file_name)
+            dst_name = file_name.replace(".xls", ".xlsx") if file_name.endswith(".xls") else file_name
+            tile_file(src, os.path.join(input_folder, dst_name), args.rows)
+
+            cwd = os.getcwd()
+            os.chdir(folder)
+            try:
+                parser_obj = p.get_parser_object(args.year, dst_name)
+                n_before = len(read_all(parser_obj).columns)
+                n_after = len(parser_obj.read().columns)
+                results = [
+                    measure(parser_obj, read_all, args.runs),
+                    measure(parser_obj, p.Parser.read, args.runs),
+                ]
+            finally:
+                os.chdir(cwd)
+            cells = [f"{n_before:>4} ->{n_after:>3}"] + [
+                f"{results[0][i]:8.1f} ->{results[1][i]:7.1f}" for i in range(3)
+            ]
+            print(f"{file_name:<24}" + "".join(f"{cell:>18}" if i else f"{cell:>9}" for i, cell in enumerate(cells)))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# Console output of a reconciliation with --rows checkpoints: a print per
+# checkpoint (like the previous check_monthly_balances) vs. one buffered
+# Table, and the quiet mode. Output goes to a line-buffered /dev/null, so
+# only formatting & write calls count (a terminal is slower per write).
+#
+#   PYTHONPATH=. python benchmarks/report_table.py [--rows 10000] [--runs 5]
+import argparse
+import contextlib
+import datetime as dt
+import os
+import random
+import sys
+import time
+
+import finance.table as tb
+
+
+def print_rows(rows: list):
+    # same content, a format & print call per row
+    print("Check monthly balances:")
+    for date, account, currency, initial, pnl, reported, adjustment in rows:
+        print(f"-- {date}: {account} {currency} {initial:10.2f} {pnl:10.2f} {reported:10.2f} {adjustment:10.2f}")
+        sys.stdout.flush()
+
+
+def show_table(rows: list, quiet=False):
+    table = tb.Table(
+        "Check monthly balances",
+        ["Date", "Account", "Currency", "Initial", "PnL", "Reported", "Adjustment"],
+        {col: ".2f" for col in ["Initial", "PnL", "Reported", "Adjustment"]},
+    )
+    for row in rows:
+        table.add(*row)
+    table.show(quiet=quiet)
+
+
+def best_ms(function, rows: list, runs: int) -> float:
+    times = []
+    with open(os.devnull, "w", buffering=1) as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(runs):
+            start = time.perf_counter()
+            function(rows)
+            times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows = [
+        (str(dt.date(2023, 1, 1) + dt.timedelta(days=rng.randint(0, 364))), f"Account{i % 50}", "USD",
+         rng.uniform(-1e4, 1e4), rng.uniform(-1e4, 1e4), rng.uniform(-1e4, 1e4), 0.0)
+        for i in range(args.rows)
+    ]
+    print(f"{'print per row':<16}{best_ms(print_rows, rows, args.runs):8.1f} ms")
+    print(f"{'table':<16}{best_ms(show_table, rows, args.runs):8.1f} ms")
+    print(f"{'table (quiet)':<16}{best_ms(lambda r: show_table(r, quiet=True), rows, args.runs):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# Handing a transaction frame to worker processes: pickling the frame per
+# task vs. publishing it once as a SharedFrame & pickling only the handle.
+# Reports bytes sent per task, serialize / deserialize time in one process and
+# the wall time of --tasks report tasks in a process pool.
+#
+#   PYTHONPATH=. python benchmarks/shared_frame.py [--rows 1000000] [--tasks 4] [--workers 2]
+import argparse
+import concurrent.futures as cf
+import datetime as dt
+import multiprocessing as mp
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+import finance.shared as sh
+
+
+def get_transactions(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    days = [dt.date(2023, 1, 1) + dt.timedelta(days=day) for day in range(365)]
+    return pd.DataFrame({
+        "Date": np.array(days, dtype=object)[rng.integers(0, 365, rows)],
+        "Account": rng.choice(["HSBC_Checking", "Wise", "Cash"], rows).astype(object),
+        "Amount": rng.normal(0, 100, rows).round(2),
+        "Currency": rng.choice(["USD", "HUF"], rows).astype(object),
+        "Priority": rng.integers(1, 5, rows),
+        "CategoryType": rng.choice(["Expense", "Income"], rows).astype(object),
+        "CategoryName": rng.choice([f"Category{i}" for i in range(40)], rows).astype(object),
+        "Month": rng.integers(1, 13, rows),
+        "AmountUSD": rng.normal(0, 100, rows).round(2),
+        "Details": np.array([f"2023-01-01 Shop {i}" for i in range(rows)], dtype=object),
+    })
+
+
+def summarize(df: pd.DataFrame) -> float:
+    # stands in for a report stage (summarize_categories, get_pnl, ...)
+    return float(df.groupby(["CategoryType", "CategoryName", "Month"])["AmountUSD"].sum().abs().sum())
+
+
+def summarize_pickled(df: pd.DataFrame) -> float:
+    return summarize(df)
+
+
+def summarize_shared(frame: sh.SharedFrame) -> float:
+    try:
+        return summarize(frame.to_frame(["CategoryType", "CategoryName", "Month", "AmountUSD"]))
+    finally:
+        frame.close()
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run_pool(function, arg, tasks: int, workers: int) -> tuple:
+    context = mp.get_context("spawn")
+    with cf.ProcessPoolExecutor(workers, mp_context=context) as executor:
+        # start the workers before timing
+        list(executor.map(time.sleep, [0] * workers))
+        start = time.perf_counter()
+        results = list(executor.map(function, [arg] * tasks))
+        return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--tasks", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    df = get_transactions(args.rows)
+    print(f"{args.rows} rows, {df.memory_usage(deep=True).sum() / 2 ** 20:.0f} MB in memory")
+
+    data, dumps = timed(pickle.dumps, df, pickle.HIGHEST_PROTOCOL)
+    _, loads = timed(pickle.loads, data)
+    print(f"{'pickle frame':<22}{len(data) / 2 ** 20:10.1f} MB  dumps {dumps * 1000:7.0f} ms  loads {loads * 1000:7.0f} ms")
+
+    frame, publish = timed(sh.SharedFrame.publish, df)
+    try:
+        handle = pickle.dumps(frame)
+        attached = pickle.loads(handle)
+        _, numeric = timed(attached.to_frame, ["Amount", "Priority", "Month", "AmountUSD"])
+        _, full = timed(attached.to_frame)
+        print(
+            f"{'shared frame':<22}{len(handle) / 2 ** 10:10.1f} KB  publish {publish * 1000:5.0f} ms"
+            f"  attach numeric {numeric * 1000:.1f} ms, all columns {full * 1000:.0f} ms"
+        )
+        del attached
+
+        expected = summarize(df)
+        results, pickled = run_pool(summarize_pickled, df, args.tasks, args.workers)
+        assert np.allclose(results, expected)
+        results, shared = run_pool(summarize_shared, frame, args.tasks, args.workers)
+        assert np.allclose(results, expected)
+        print(f"{args.tasks} tasks, {args.workers} workers    pickle {pickled * 1000:7.0f} ms  shared {shared * 1000:7.0f} ms")
+    finally:
+        frame.close()
+
+
+if __name__ == "__main__":
+    main()
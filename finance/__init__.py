@@ -0,0 +1,13 @@
+import importlib
+
+SUBMODULES = [
+    "cache", "categorize", "dag", "dataframe", "functions", "index", "matcher", "parser",
+    "pipeline", "report", "session", "shared", "store", "table", "validate", "watch",
+]
+
+
+def __getattr__(name: str):
+    # submodules (and the pandas/numpy they use) are imported on first access
+    if name in SUBMODULES:
+        return importlib.import_module(f"finance.{name}")
+    raise AttributeError(f"module 'finance' has no attribute '{name}'")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import collections
+import functools
+import os
+import threading
+
+import finance.table as tb
+
+MAXSIZE = 256
+# every file cache, for the hit / miss / eviction counters
+CACHES = []
+
+
+def get_file_stamp(f_path: str) -> tuple:
+    # None if the file is missing (results of missing files are not cached)
+    try:
+        stat = os.stat(f_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileCache:
+    # LRU cache of a function reading files: entries are keyed by the
+    # arguments & absolute file paths (data paths are relative to the working
+    # directory) and valid while the files keep their mtime & size
+    def __init__(self, function, get_paths, maxsize=MAXSIZE):
+        functools.update_wrapper(self, function)
+        self.function = function
+        # arguments -> files read by the function
+        self.get_paths = get_paths
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHES.append(self)
+
+    def __call__(self, *args, **kwargs):
+        try:
+            f_paths = tuple(os.path.abspath(f_path) for f_path in self.get_paths(*args, **kwargs))
+            key = (args, tuple(sorted(kwargs.items())), f_paths)
+            hash(key)
+        except TypeError:
+            # e.g. frames passed as arguments
+            return self.function(*args, **kwargs)
+        stamps = tuple(get_file_stamp(f_path) for f_path in f_paths)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == stamps:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return copy_result(entry[1])
+            self.misses += 1
+        result = self.function(*args, **kwargs)
+        if None not in stamps:
+            with self.lock:
+                self.entries[key] = (stamps, result)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return copy_result(result)
+
+    def cache_info(self) -> dict:
+        return {
+            "Function": f"{self.function.__module__}.{self.function.__qualname__}",
+            "Hits": self.hits,
+            "Misses": self.misses,
+            "Evictions": self.evictions,
+            "Size": len(self.entries),
+            "MaxSize": self.maxsize,
+        }
+
+    def cache_clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+def copy_result(result):
+    # callers may change returned lists, dicts & frames, the cached one stays
+    # intact
+    return result.copy() if hasattr(result, "copy") else result
+
+
+def file_cache(get_paths, maxsize=MAXSIZE):
+    def decorator(function):
+        return FileCache(function, get_paths, maxsize)
+
+    return decorator
+
+
+def get_stats() -> list:
+    return [cache.cache_info() for cache in CACHES]
+
+
+def clear():
+    for cache in CACHES:
+        cache.cache_clear()
+
+
+def show_stats():
+    table = tb.Table(
+        "Caches",
+        ["Function", "Hits", "Misses", "Evictions", "Size", "MaxSize"],
+        {col: "d" for col in ["Hits", "Misses", "Evictions", "Size", "MaxSize"]},
+    )
+    for info in get_stats():
+        table.add(*[info[col] for col in table.columns])
+    table.show(quiet=False)
@@ -1,39 +1,68 @@
 #!/usr/bin/env python
+from __future__ import annotations
 
 import os
 import pprint as pp
 
-import numpy as np
-import pandas as pd
-
 import finance.dataframe as d
 import finance.functions as f
+import finance.index as ix
+import finance.matcher as m
+import finance.store as st
+
+np = f.lazy_import("numpy")
+pd = f.lazy_import("pandas")
 
 
-def match_existing_categories(df: pd.DataFrame, df_cat: pd.DataFrame, year: int) -> pd.DataFrame:
+def match_existing_categories(
+    df: pd.DataFrame, df_cat: pd.DataFrame, year: int, save_matches=False, token_index=None
+) -> pd.DataFrame:
     # add categories
-    df = add_category(df, df_cat)
+    match_index = get_match_index(df, df_cat, token_index=token_index)
+    if save_matches:
+        match_index.save(f.get_path(year, "output", "matches.npz"))
+    df = add_category(df, df_cat, match_index)
 
     # export transactions (some might not have a category yet)
-    f_path = f.get_path(year, "output", "transactions.xlsx")
     df.sort_values(by=["CategoryName", "Date"], ascending=[False, True], inplace=True)
-    df.to_excel(f_path, index=False)
-    if d.has_missing_values(df, "CategoryName"):
-        raise ValueError(f"Missing categories found in {f_path}. Please fill missing categories manually.")
+    f_path = export_transactions(df, year)
+    check_categories(df, f_path)
+    # memory-mappable copy for reports & analysis run separately
+    st.save_transactions(df, year)
+    if token_index is not None:
+        # searchable details of the stored transactions (same row order)
+        token_index.update(list(df["Details"]))
+        ix.save_index(token_index, year)
 
     return df
 
 
+def export_transactions(
+    df: pd.DataFrame, year: int, column_widths=None, auto_filter=False, side_outputs=None
+) -> str:
+    f_path = f.get_path(year, "output", "transactions.xlsx")
+    st.save_excel(df, f_path, column_widths=column_widths, auto_filter=auto_filter)
+    st.save_side_outputs(df, f_path, side_outputs or [])
+    return f_path
+
+
+def check_categories(df: pd.DataFrame, f_path: str):
+    if d.has_missing_values(df, "CategoryName"):
+        raise ValueError(f"Missing categories found in {f_path}. Please fill missing categories manually.")
+
+
 def parse_categories_from_transactions(year: int) -> pd.DataFrame:
     import os.path
 
     f_path = f.get_path(year, "output", "transactions.xlsx")
-    cat_cols = ["Priority", "Comment", "CategoryType", "CategoryName", "Pattern"]
+    cat_cols = ["Priority", "Comment", "CategoryType", "CategoryName", "Pattern", "PatternType"]
     df_cat = pd.DataFrame(columns=cat_cols)
 
     if os.path.isfile(f_path):
         # parse transactions
         df_all = pd.read_excel(f_path, engine="openpyxl")
+        if not d.has_column(df_all, "PatternType"):
+            df_all["PatternType"] = np.nan
         # select rows with category
         df = df_all.loc[~df_all["CategoryName"].isnull(),]
         # if pattern is missing, use transaction details
@@ -42,51 +71,198 @@ def parse_categories_from_transactions(year: int) -> pd.DataFrame:
         df.loc[df["Priority"].isnull(), "Priority"] = 1
         # if category type is not provided, use cost
         df.loc[df["CategoryType"].isnull(), "CategoryType"] = "Costs"
+        # if pattern type is missing, match pattern as literal text
+        df.loc[df["PatternType"].isnull(), "PatternType"] = m.DEFAULT_PATTERN_TYPE
         # select relevant columns & remove duplicates
         df_cat = df[cat_cols].drop_duplicates()
+        df_cat = compact_categories(df_cat)
 
     return df_cat
 
 
-def add_category(df: pd.DataFrame, df_cat: pd.DataFrame) -> pd.DataFrame:
-    # check input data
-    d.has_column(df, "Details", raise_error=True)
-    d.has_duplicates(df_cat, "Pattern", raise_error=True)
+def compact_categories(df_cat: pd.DataFrame) -> pd.DataFrame:
+    n_patterns = len(df_cat.index)
+    df_cat = df_cat.drop_duplicates().reset_index(drop=True)
+    n_duplicates = n_patterns - len(df_cat.index)
+    if not d.has_column(df_cat, "PatternType"):
+        df_cat["PatternType"] = m.DEFAULT_PATTERN_TYPE
+    pattern_types = df_cat["PatternType"].apply(m.get_pattern_type)
+
+    # drop patterns implied by a shorter literal with the same category: the
+    # longer patterns containing a literal are looked up in a token index
+    group_cols = [col for col in df_cat.columns if col not in ["Pattern", "PatternType"]]
+    df_plain = df_cat[pattern_types == "Literal"]
+    patterns = list(df_plain["Pattern"].astype(str))
+    groups = df_plain.groupby(group_cols, dropna=False, sort=False).ngroup().to_numpy()
+    token_index = ix.TokenIndex(patterns)
+    is_subsumed_plain = np.full(len(patterns), False)
+    for i, pattern in enumerate(patterns):
+        rows = token_index.get_candidates(pattern)
+        for row in range(len(patterns)) if rows is None else rows:
+            if row != i and groups[row] == groups[i] and pattern in patterns[row]:
+                is_subsumed_plain[row] = True
+    is_subsumed = pd.Series(False, index=df_cat.index)
+    is_subsumed[df_plain.index[is_subsumed_plain]] = True
+    df_cat = df_cat[~is_subsumed]
+
+    # report table size
+    n_compact = len(df_cat.index)
+    print("Compact categories:")
+    print(f"-- {n_patterns} -> {n_compact} patterns ({n_patterns - n_compact} removed)")
+    print(f"-- {n_duplicates} duplicated, {is_subsumed.sum()} subsumed")
 
+    return df_cat
+
+
+def sort_categories(df_cat: pd.DataFrame) -> pd.DataFrame:
     # sort patterns by date (later date ~ higher priority)
-    df_cat_sorted = df_cat.sort_values(
+    return df_cat.sort_values(
         by=["Priority"], ascending=True
     )
 
-    # add empty category columns to transactions data
+
+def get_match_index(df: pd.DataFrame, df_cat: pd.DataFrame, workers=None, token_index=None) -> m.MatchIndex:
+    # check input data
+    d.has_column(df, "Details", raise_error=True)
+    d.has_duplicates(df_cat, "Pattern", raise_error=True)
+
+    df_cat_sorted = sort_categories(df_cat)
+
+    # find matching patterns for each transaction: only on the candidates of
+    # the token index if given, else in parallel for large inputs
+    matcher = m.PatternMatcher.from_frame(df_cat_sorted)
+    if token_index is not None:
+        token_index.update(list(df["Details"]))
+        matches = token_index.match(matcher)
+    else:
+        matches = m.match_parallel(matcher, df["Details"], workers)
+    return m.MatchIndex(df["Details"], df_cat_sorted, matches)
+
+
+def add_category(df: pd.DataFrame, df_cat: pd.DataFrame, match_index=None) -> pd.DataFrame:
+    if match_index is None:
+        match_index = get_match_index(df, df_cat)
+    df_cat_sorted = match_index.df_cat
+    winners = match_index.winners
+
+    # check for multiple match
+    if len(match_index.conflicts) > 0:
+        pp.pprint(match_index.get_conflicts())
+        raise ValueError("Multiple categories found!")
+
+    # add category based on pattern (empty category if nothing matches)
     for col in df_cat.columns:
-        df[col] = 1 if col == "Priority" else ""
-
-    # parse each pattern & assign category
-    for _, cat_row in df_cat_sorted.iterrows():
-
-        # logical vectors
-        pattern = cat_row["Pattern"]
-        has_pattern = df["Details"].str.contains(pattern, regex=False)
-        same_priority = df["Priority"] == cat_row["Priority"]
-        lower_priority = df["Priority"] < cat_row["Priority"]
-        same_category = df["CategoryName"] == cat_row["CategoryName"]
-        is_empty = df["CategoryName"] == ""
-
-        # check for multiple match
-        df_multi = df[has_pattern & same_priority & ~same_category & ~is_empty]
-        if len(df_multi.index) > 0:
-            pp.pprint(df_multi)
-            raise ValueError("Multiple categories found!")
-        else:
-            # add category based on pattern
-            df.loc[
-                has_pattern & (is_empty | lower_priority | same_category),
-                df_cat.columns,
-            ] = cat_row[df_cat.columns].to_numpy()
+        default = 1 if col == "Priority" else ""
+        values = np.append(df_cat_sorted[col].to_numpy(dtype=object), default)
+        df[col] = values[winners]
 
     # move details to last column
     df_details = df.pop("Details")
     df["Details"] = df_details
 
     return df
+
+
+def get_changed_patterns(df_cat_old: pd.DataFrame, df_cat_new: pd.DataFrame) -> tuple:
+    # patterns whose rule (type, category or priority) was removed / added;
+    # a modified pattern is both
+    def get_rules(df_cat: pd.DataFrame) -> dict:
+        df_rules = df_cat.reindex(columns=m.MatchIndex.index_cols)
+        df_rules["PatternType"] = df_rules["PatternType"].apply(m.get_pattern_type)
+        return {
+            str(rule[0]): (rule[1], str(rule[2]), float(rule[3]))
+            for rule in df_rules.itertuples(index=False, name=None)
+        }
+
+    rules_old, rules_new = get_rules(df_cat_old), get_rules(df_cat_new)
+    removed = {p for p, rule in rules_old.items() if rules_new.get(p) != rule}
+    added = {p for p, rule in rules_new.items() if rules_old.get(p) != rule}
+    return removed, added
+
+
+def preview_category_changes(
+    match_index: m.MatchIndex, df_cat_new: pd.DataFrame, token_index=None
+) -> pd.DataFrame:
+    # transactions whose category changes with the new category table: only
+    # rows matched by removed / modified patterns (from the match index) &
+    # candidate rows of added / modified patterns (from the token index) are
+    # re-evaluated, the full table is never matched again
+    d.has_duplicates(df_cat_new, "Pattern", raise_error=True)
+    details = match_index.details
+    if token_index is None:
+        token_index = ix.TokenIndex(details)
+    df_cat_old = match_index.df_cat
+    removed, added = get_changed_patterns(df_cat_old, df_cat_new)
+    df_cat_sorted = sort_categories(df_cat_new).reset_index(drop=True)
+    new_positions = {str(p): pos for pos, p in enumerate(df_cat_sorted["Pattern"])}
+    old_patterns = [str(p) for p in df_cat_old["Pattern"]]
+
+    # rows matched by removed patterns
+    rows = np.repeat(np.arange(len(details)), np.diff(match_index.indptr))
+    removed_positions = [pos for pos, p in enumerate(old_patterns) if p in removed]
+    affected = set(rows[np.isin(match_index.indices, removed_positions)])
+
+    # rows matched by added patterns (candidates from the token index)
+    df_added = df_cat_sorted[[str(p) in added for p in df_cat_sorted["Pattern"]]]
+    added_matches = {}
+    for pattern, pattern_type in zip(df_added["Pattern"].astype(str), df_added["PatternType"]):
+        matcher = m.PatternMatcher([pattern], [pattern_type])
+        candidates = token_index.get_pattern_candidates(pattern, matcher.pattern_types[0])
+        for row in range(len(details)) if candidates is None else candidates:
+            if matcher.match_text(details[row]):
+                added_matches.setdefault(int(row), []).append(new_positions[pattern])
+    affected |= set(added_matches)
+
+    # replay the priority rules with the new table for the affected rows
+    affected = sorted(int(row) for row in affected)
+    matches = [
+        sorted(
+            [
+                new_positions[old_patterns[pos]]
+                for pos in match_index.get_patterns(row)
+                if old_patterns[pos] not in removed
+            ]
+            + added_matches.get(row, [])
+        )
+        for row in affected
+    ]
+    winners, conflicts = m.resolve_categories(
+        matches, list(df_cat_sorted["Priority"]), list(df_cat_sorted["CategoryName"])
+    )
+    conflict_rows = {affected[row] for _, row in conflicts}
+    old_conflict_rows = {row for _, row in match_index.conflicts}
+
+    def get_winner(df_cat: pd.DataFrame, pos: int) -> tuple:
+        if pos < 0:
+            return None, ""
+        return df_cat.loc[pos, "Pattern"], df_cat.loc[pos, "CategoryName"]
+
+    diff = []
+    for row, winner in zip(affected, winners):
+        old_pattern, old_category = get_winner(df_cat_old, match_index.winners[row])
+        new_pattern, new_category = get_winner(df_cat_sorted, winner)
+        is_conflict = row in conflict_rows
+        if old_category != new_category or is_conflict != (row in old_conflict_rows):
+            diff.append([row, details[row], old_pattern, old_category, new_pattern, new_category, is_conflict])
+    return pd.DataFrame(
+        diff,
+        columns=["Row", "Details", "OldPattern", "OldCategory", "NewPattern", "NewCategory", "Conflict"],
+    )
+
+
+def preview_year(year: int) -> pd.DataFrame:
+    # effect of the categories edited in transactions.xlsx on the transactions
+    # of the last run (without running the pipeline)
+    f_path = f.get_path(year, "output", "matches.npz")
+    if not os.path.isfile(f_path):
+        raise ValueError(f"No match index found in {f_path}. Please run the pipeline first.")
+    match_index = m.MatchIndex.load(f_path)
+    # texts indexed by the last run are reused, only the row order is updated
+    token_index = ix.load_index(year)
+    token_index.update(list(match_index.details))
+    df_diff = preview_category_changes(match_index, parse_categories_from_transactions(year), token_index)
+    print("Preview category changes:")
+    print(f"-- {len(df_diff.index)} transactions change")
+    if not df_diff.empty:
+        print(df_diff.to_string(index=False))
+    return df_diff
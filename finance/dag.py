@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+import glob
+import hashlib
+import importlib
+import json
+import os
+import os.path
+import pickle
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import finance.functions as f
+
+WORKERS = 4
+
+
+def get_hash(value) -> str:
+    return hashlib.sha1(pickle.dumps(value, protocol=4)).hexdigest()
+
+
+def get_file_stat(f_path: str) -> tuple:
+    if not os.path.exists(f_path):
+        return f_path, None
+    stat = os.stat(f_path)
+    return f_path, stat.st_size, stat.st_mtime_ns
+
+
+def get_code_version() -> str:
+    # cached artifacts are stale once the package code changes
+    package_folder = os.path.dirname(os.path.abspath(__file__))
+    return get_hash([get_file_stat(f_path)[1:] for f_path in sorted(glob.glob(os.path.join(package_folder, "*.py")))])
+
+
+class Stage:
+    def __init__(self, name: str, function, files=None, upstream=None, outputs=None):
+        self.name = name
+        self.function = function
+        # input files as (folder, file name or None for every file in folder)
+        self.files = files or []
+        self.upstream = upstream or []
+        # output files as (folder, file name)
+        self.outputs = outputs or []
+
+    def get_file_paths(self, year: int) -> list:
+        f_paths = []
+        for folder, file_name in self.files:
+            if file_name is None:
+                folder_files = sorted(os.listdir(f.get_path(year, folder)))
+                f_paths += [f.get_path(year, folder, folder_file) for folder_file in folder_files]
+            else:
+                f_paths.append(f.get_path(year, folder, file_name))
+        return f_paths
+
+    def has_outputs(self, year: int) -> bool:
+        return all(os.path.exists(f.get_path(year, folder, file_name)) for folder, file_name in self.outputs)
+
+
+def get_stage_order(stages: dict) -> list:
+    # upstream stages first
+    order = []
+
+    def visit(name: str, path: list):
+        if name in path:
+            raise ValueError(f"Stage cycle found: {' -> '.join(path + [name])}")
+        if name not in order:
+            for upstream in stages[name].upstream:
+                if upstream not in stages:
+                    raise ValueError(f"Unknown upstream stage '{upstream}' in '{name}'")
+                visit(upstream, path + [name])
+            order.append(name)
+
+    for stage in stages:
+        visit(stage, [])
+    return order
+
+
+def get_downstream_stages(stages: dict, names: set) -> set:
+    downstream = set(names)
+    for name in get_stage_order(stages):
+        if any(upstream in downstream for upstream in stages[name].upstream):
+            downstream.add(name)
+    return downstream
+
+
+class DAG:
+    def __init__(self, year: int, stages: list, cache_folder=None, workers=WORKERS, preload=None):
+        self.year = year
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = get_stage_order(self.stages)
+        self.cache_folder = cache_folder or f.get_path(year, "cache")
+        self.workers = workers
+        # modules imported before the workers start: concurrent first imports
+        # of a package with circular imports (e.g. openpyxl) can fail
+        self.preload = preload or []
+        self.code_version = get_code_version()
+        # stage -> fingerprint, artifact hash & artifact (loaded on demand)
+        self.results = {}
+
+    def get_fingerprint(self, stage: Stage) -> str:
+        return get_hash([
+            stage.name,
+            self.year,
+            self.code_version,
+            [get_file_stat(f_path) for f_path in stage.get_file_paths(self.year)],
+            [self.results[upstream]["hash"] for upstream in stage.upstream],
+        ])
+
+    def get_cache_path(self, name: str, ext: str) -> str:
+        return os.path.join(self.cache_folder, f"{name}.{ext}")
+
+    def load_result(self, name: str, fingerprint: str) -> bool:
+        result = self.results.get(name)
+        if result is None and os.path.isfile(self.get_cache_path(name, "json")):
+            result = f.read_json(self.get_cache_path(name, "json"))
+        if result is None or result["fingerprint"] != fingerprint:
+            return False
+        self.results[name] = result
+        return True
+
+    def save_result(self, name: str, fingerprint: str, artifact):
+        self.results[name] = {"fingerprint": fingerprint, "hash": get_hash(artifact), "artifact": artifact}
+        os.makedirs(self.cache_folder, exist_ok=True)
+        with open(self.get_cache_path(name, "pkl"), "wb") as file:
+            pickle.dump(artifact, file, protocol=4)
+        with open(self.get_cache_path(name, "json"), "w") as file:
+            json.dump({"fingerprint": fingerprint, "hash": self.results[name]["hash"]}, file)
+
+    def get_artifact(self, name: str):
+        result = self.results[name]
+        if "artifact" not in result:
+            with open(self.get_cache_path(name, "pkl"), "rb") as file:
+                result["artifact"] = pickle.load(file)
+        return result["artifact"]
+
+    def run(self, force=False) -> dict:
+        # stage -> "run" or "skip"
+        status = {}
+        running = {}
+        fingerprints = {}
+        for module in self.preload:
+            importlib.import_module(module)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while len(status) < len(self.order):
+                for name in self.order:
+                    stage = self.stages[name]
+                    is_ready = all(status.get(upstream) for upstream in stage.upstream)
+                    if name in status or name in running.values() or not is_ready:
+                        continue
+                    fingerprint = fingerprints[name] = self.get_fingerprint(stage)
+                    if not force and stage.has_outputs(self.year) and self.load_result(name, fingerprint):
+                        print(f"Skip stage '{name}' (unchanged)")
+                        status[name] = "skip"
+                        continue
+                    artifacts = {upstream: self.get_artifact(upstream) for upstream in stage.upstream}
+                    future = executor.submit(stage.function, self.year, artifacts)
+                    running[future] = name
+                if len(running) == 0:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        # let running stages finish, then fail
+                        wait(running)
+                        raise future.exception()
+                    self.save_result(name, fingerprints[name], future.result())
+                    status[name] = "run"
+        return status
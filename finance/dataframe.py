@@ -1,14 +1,15 @@
 #!/usr/bin/env python
+from __future__ import annotations
 
 import datetime as dt
 import re
 from typing import Union
 
-import numpy as np
-import pandas as pd
-
 import finance.functions as f
 
+np = f.lazy_import("numpy")
+pd = f.lazy_import("pandas")
+
 
 def strip_col_names(df: pd.DataFrame) -> pd.DataFrame:
     df.columns = df.columns.str.strip()
@@ -143,6 +144,41 @@ def has_column(df: pd.DataFrame, column: str, raise_error=False) -> bool:
     return has_col
 
 
+COLS_VIOLATION = ["Check", "Column", "Rows", "Message"]
+
+
+def get_violations(df: pd.DataFrame, columns: list, year=None, date_column="Date") -> pd.DataFrame:
+    # every schema / missing value / year violation with the affected row
+    # labels, in the order the checks used to raise them
+    violations = []
+    if len(df.index) == 0:
+        violations.append(["empty", None, [], "Empty dataframe!"])
+    for column in columns:
+        if column not in df.columns:
+            violations.append(["column", column, [], f"Column '{column}' not found!"])
+    extra_columns = [column for column in df.columns if column not in columns]
+    if len(extra_columns) > 0:
+        violations.append(["extra", extra_columns, [], "Extra columns found in dataframe!"])
+    # missing values of all columns in one block-wise pass
+    missing = (df.isna() | df.eq("")).to_numpy()
+    for i in np.flatnonzero(missing.any(axis=0)):
+        rows = list(df.index[missing[:, i]])
+        violations.append(["missing", df.columns[i], rows, f"Missing values in '{df.columns[i]}'"])
+    if year is not None and date_column in df.columns:
+        is_present = ~missing[:, df.columns.get_loc(date_column)]
+        dates = pd.to_datetime(df[date_column], errors="coerce")
+        is_invalid = is_present & dates.isna().to_numpy()
+        if is_invalid.any():
+            rows = list(df.index[is_invalid])
+            violations.append(["date", date_column, rows, f"Invalid dates found in '{date_column}'"])
+        years = dates.dt.year.to_numpy()
+        is_other_year = is_present & ~is_invalid & (years != year)
+        for other_year in np.unique(years[is_other_year]):
+            rows = list(df.index[is_other_year & (years == other_year)])
+            violations.append(["year", date_column, rows, f"Invalid year {int(other_year)} found in data!"])
+    return pd.DataFrame(violations, columns=COLS_VIOLATION)
+
+
 def parse_csv(year: int, folder: str, file_name: str) -> pd.DataFrame:
     f_path = f.get_path(year, folder, file_name)
     df = pd.read_csv(f_path, encoding="utf-8")
@@ -177,3 +213,68 @@ def filter_values(
 def filter_date(df: pd.DataFrame, date_object: dt.date):
     has_column(df, "Date", raise_error=True)
     return df[df["Date"] <= date_object]
+
+
+class IndexedFrame:
+    # rows sorted by key columns (then date) with running totals per key group,
+    # so lookups are binary searches instead of full boolean scans
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        columns: list,
+        value_column="Amount",
+        date_column="Date",
+    ):
+        has_column(df, value_column, raise_error=True)
+        has_columns(df, columns, raise_error=True)
+        self.columns = list(columns)
+        self.date_column = date_column
+        sort_columns = self.columns + (
+            [date_column] if has_column(df, date_column) else []
+        )
+        df_sorted = df.sort_values(by=sort_columns, kind="mergesort")
+        self.keys = [df_sorted[col].to_numpy() for col in self.columns]
+        self.dates = (
+            df_sorted[date_column].to_numpy()
+            if has_column(df, date_column)
+            else None
+        )
+        # e.g. amounts parsed as object dtype
+        values = df_sorted[value_column].astype(float)
+        self.totals = (
+            values.groupby([df_sorted[col] for col in self.columns], sort=False)
+            .cumsum()
+            .to_numpy()
+            if self.columns
+            else values.cumsum().to_numpy()
+        )
+
+    def locate(self, filter_dict: dict, raise_error=False) -> tuple:
+        if list(filter_dict) != self.columns:
+            raise ValueError(f"Index columns are {self.columns}!")
+        start, stop = 0, len(self.totals)
+        for keys, (column, value) in zip(self.keys, filter_dict.items()):
+            group = keys[start:stop]
+            start, stop = (
+                start + np.searchsorted(group, value, side="left"),
+                start + np.searchsorted(group, value, side="right"),
+            )
+            if start == stop:
+                if raise_error:
+                    raise ValueError(
+                        f"No '{value}' found in column '{column}'"
+                    )
+                break
+        return start, stop
+
+    def sum(
+        self, filter_dict: dict, cutoff_date=None, raise_error=False
+    ) -> float:
+        start, stop = self.locate(filter_dict, raise_error)
+        if cutoff_date:
+            if self.dates is None:
+                raise ValueError(f"Column '{self.date_column}' not found!")
+            stop = start + np.searchsorted(
+                self.dates[start:stop], cutoff_date, side="right"
+            )
+        return self.totals[stop - 1] if stop > start else 0
@@ -1,15 +1,35 @@
 #!/usr/bin/env python
 
+import importlib
 import json
 import os
 import os.path as p
 
+import finance.cache as cache
+
+
+class LazyModule:
+    # imports the module on first attribute access (import lock makes it thread-safe)
+    def __init__(self, name: str):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attr: str):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
 
 def get_path(year: int, folder_name: str, file_name=None):
     folder_path = p.join("data", str(year), folder_name)
     return p.join(folder_path, file_name) if file_name else folder_path
 
 
+@cache.file_cache(lambda year: [get_path(year, "input")])
 def get_transaction_files(year: int):
     folder_path = get_path(year, "input")
     files = os.listdir(folder_path)
@@ -21,22 +41,24 @@ def balance_info(currency: str, balance_initial: float, account_pnl: float, bala
     balance_actual = balance_initial + account_pnl
     bal_expected = balance_reported + adjustment
     balance_diff = bal_expected - balance_actual
-    new_adjustment = "{:.2f}".format(adjustment - balance_diff)
-    bal_info = (f"\tA) Initial:\t\t\t\t{print_number(balance_initial)} {currency}\n"
-                f"\tB) PnL:\t\t\t\t\t{print_number(account_pnl)} {currency}\n"
-                f"\tC) ACTUAL (A+B):\t\t{print_number(balance_actual)} {currency}\n"
-                f"\tD) Reported:\t\t\t{print_number(balance_reported)} {currency}\n"
-                f"\tE) Adjustment:\t\t\t{print_number(adjustment)} {currency}\n"
-                f"\tF) EXPECTED (D+E):\t\t{print_number(bal_expected)} {currency}\n"
-                f"\tG) DIFFERENCE (F-C):\t{print_number(balance_diff)} {currency}\n"
-                f"\t--------------------------------------------\n"
-                f"\tHINT: Set E) to {new_adjustment} to resolve difference")
-    return bal_info
+    lines = [
+        ("A) Initial:\t\t\t\t", balance_initial),
+        ("B) PnL:\t\t\t\t\t", account_pnl),
+        ("C) ACTUAL (A+B):\t\t", balance_actual),
+        ("D) Reported:\t\t\t", balance_reported),
+        ("E) Adjustment:\t\t\t", adjustment),
+        ("F) EXPECTED (D+E):\t\t", bal_expected),
+        ("G) DIFFERENCE (F-C):\t", balance_diff),
+    ]
+    # built in one join instead of a format call per line
+    return "".join([f"\t{label}{number:10.2f} {currency}\n" for label, number in lines] + [
+        "\t--------------------------------------------\n",
+        f"\tHINT: Set E) to {adjustment - balance_diff:.2f} to resolve difference",
+    ])
 
 
 def print_number(number: float):
-    number_string = "{:10.2f}".format(number)
-    return number_string
+    return f"{number:10.2f}"
 
 
 def read_json(f_path: str):
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import os.path
+import re
+
+import finance.functions as f
+import finance.matcher as m
+
+np = f.lazy_import("numpy")
+
+NGRAM = 3
+# postings are intersected until this few candidates are left (callers check
+# the candidate texts anyway)
+MIN_CANDIDATES = 16
+TOKEN_SEARCH = re.compile(r"\w+").findall
+
+
+def get_ngrams(text: str) -> set:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def get_tokens(text: str) -> set:
+    return {token.lower() for token in TOKEN_SEARCH(text)}
+
+
+def merge_postings(postings: dict, new_postings: dict):
+    # new texts have higher ids, so appending keeps the postings sorted
+    for key, texts in new_postings.items():
+        if key in postings:
+            postings[key] = np.concatenate([postings[key], texts])
+        else:
+            postings[key] = np.array(texts, dtype=np.int64)
+
+
+def get_csr(postings: dict) -> tuple:
+    keys = sorted(postings)
+    lengths = [len(postings[key]) for key in keys]
+    indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    indices = np.concatenate([postings[key] for key in keys]) if keys else np.array([], dtype=np.int64)
+    return np.array(keys, dtype=str), indptr, indices.astype(np.int32)
+
+
+def from_csr(keys, indptr, indices) -> dict:
+    indices = indices.astype(np.int64)
+    return {str(key): indices[indptr[i]:indptr[i + 1]] for i, key in enumerate(keys)}
+
+
+def encode_texts(texts: list) -> tuple:
+    # utf-8 bytes & offsets, a fixed width string array would pad every text
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.concatenate([[0], np.cumsum([len(text) for text in encoded], dtype=np.int64)])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_texts(data, offsets) -> list:
+    data = data.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+class TokenIndex:
+    # inverted index of the transaction details: character n-grams (substring
+    # queries: a text containing a substring contains all of its n-grams) &
+    # word tokens (token queries, case-insensitive); postings refer to the
+    # unique texts, so updating the rows only indexes texts not seen before
+    def __init__(self, details=None):
+        self.texts = []
+        self.text_ids = {}
+        # n-gram / token -> text ids (ascending)
+        self.postings = {}
+        self.tokens = {}
+        self.update([] if details is None else details)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.row_texts)
+
+    def update(self, details):
+        # set the indexed rows (e.g. after new files were parsed)
+        new_postings, new_tokens = {}, {}
+        row_texts = np.full(len(details), -1, dtype=np.int64)
+        for row, text in enumerate(details):
+            if not isinstance(text, str):
+                continue
+            text_id = self.text_ids.get(text)
+            if text_id is None:
+                text_id = self.text_ids[text] = len(self.texts)
+                self.texts.append(text)
+                for ngram in get_ngrams(text):
+                    new_postings.setdefault(ngram, []).append(text_id)
+                for token in get_tokens(text):
+                    new_tokens.setdefault(token, []).append(text_id)
+            row_texts[row] = text_id
+        merge_postings(self.postings, new_postings)
+        merge_postings(self.tokens, new_tokens)
+        self.set_rows(row_texts)
+
+    def set_rows(self, row_texts):
+        # rows of text i are rows[indptr[i]:indptr[i + 1]]
+        self.row_texts = row_texts
+        order = np.argsort(row_texts, kind="stable")
+        counts = np.bincount(row_texts[row_texts >= 0], minlength=len(self.texts))
+        self.indptr = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        self.rows = order[len(order) - int(self.indptr[-1]):]
+
+    def add(self, details):
+        self.update([self.get_text(row) for row in range(self.n_rows)] + list(details))
+
+    def get_text(self, row: int):
+        text_id = self.row_texts[row]
+        return None if text_id < 0 else self.texts[text_id]
+
+    def get_rows(self, text_ids) -> np.ndarray:
+        if len(text_ids) == 0:
+            return np.array([], dtype=np.int64)
+        return np.sort(np.concatenate([self.rows[self.indptr[i]:self.indptr[i + 1]] for i in text_ids]))
+
+    def get_text_candidates(self, text: str):
+        # texts that might contain text, None if every text might (too short)
+        ngrams = get_ngrams(text)
+        if len(ngrams) == 0:
+            return None
+        empty = np.array([], dtype=np.int64)
+        postings = sorted((self.postings.get(ngram, empty) for ngram in ngrams), key=len)
+        text_ids = postings[0]
+        for posting in postings[1:]:
+            if len(text_ids) <= MIN_CANDIDATES:
+                break
+            # postings are sorted, look up the (fewer) candidates
+            found = posting.searchsorted(text_ids).clip(max=len(posting) - 1)
+            text_ids = text_ids[posting[found] == text_ids]
+        return text_ids
+
+    def get_candidates(self, text: str):
+        # rows that might contain text, None if every row might (too short)
+        text_ids = self.get_text_candidates(text)
+        return None if text_ids is None else self.get_rows(text_ids)
+
+    def get_pattern_candidates(self, pattern: str, pattern_type: str):
+        # literal & word matches contain the pattern, regex can be anything
+        if pattern_type == "Regex":
+            return None
+        return self.get_candidates(pattern)
+
+    def search(self, text: str) -> np.ndarray:
+        # rows containing text
+        text_ids = self.get_text_candidates(text)
+        if text_ids is None:
+            text_ids = range(len(self.texts))
+        return self.get_rows([i for i in text_ids if text in self.texts[i]])
+
+    def search_token(self, token: str) -> np.ndarray:
+        # rows containing the word (case-insensitive)
+        return self.get_rows(self.tokens.get(token.lower(), []))
+
+    def match(self, matcher: m.PatternMatcher) -> list:
+        # same result as matcher.match for the indexed rows, but each pattern
+        # is only checked on the unique texts containing its n-grams
+        text_matches = [[] for _ in self.texts]
+        scanned = []
+        for pos, (pattern, pattern_type) in enumerate(zip(matcher.patterns, matcher.pattern_types)):
+            text_ids = None if pattern_type == "Regex" else self.get_text_candidates(pattern)
+            if text_ids is None:
+                scanned.append(pos)
+                continue
+            check = matcher.checks[pos]
+            for text_id in text_ids:
+                if check(self.texts[text_id]):
+                    text_matches[text_id].append(pos)
+        if len(scanned) > 0:
+            # regex & short patterns are matched on every unique text (in a
+            # process pool if there are many)
+            scan_matcher = m.PatternMatcher(
+                [matcher.patterns[pos] for pos in scanned],
+                [matcher.pattern_types[pos] for pos in scanned],
+                matcher.group_size,
+            )
+            for text_id, positions in enumerate(m.match_parallel(scan_matcher, self.texts)):
+                if len(positions) > 0:
+                    text_matches[text_id] = sorted(text_matches[text_id] + [scanned[i] for i in positions])
+        return [[] if text_id < 0 else text_matches[text_id] for text_id in self.row_texts]
+
+    def save(self, f_path: str):
+        ngrams, ngram_indptr, ngram_indices = get_csr(self.postings)
+        tokens, token_indptr, token_indices = get_csr(self.tokens)
+        texts, text_offsets = encode_texts(self.texts)
+        # uncompressed, compressing costs far more than reading the postings
+        np.savez(
+            f_path,
+            texts=texts,
+            text_offsets=text_offsets,
+            row_texts=self.row_texts.astype(np.int32),
+            ngrams=ngrams,
+            ngram_indptr=ngram_indptr,
+            ngram_indices=ngram_indices,
+            tokens=tokens,
+            token_indptr=token_indptr,
+            token_indices=token_indices,
+        )
+
+    @classmethod
+    def load(cls, f_path: str):
+        index = cls()
+        with np.load(f_path) as data:
+            index.texts = decode_texts(data["texts"], data["text_offsets"])
+            index.text_ids = {text: i for i, text in enumerate(index.texts)}
+            index.postings = from_csr(data["ngrams"], data["ngram_indptr"], data["ngram_indices"])
+            index.tokens = from_csr(data["tokens"], data["token_indptr"], data["token_indices"])
+            index.set_rows(data["row_texts"].astype(np.int64))
+        return index
+
+
+def get_index_path(year: int) -> str:
+    # next to the transaction store
+    return f.get_path(year, "output", "transactions.index.npz")
+
+
+def load_index(year: int) -> TokenIndex:
+    f_path = get_index_path(year)
+    return TokenIndex.load(f_path) if os.path.isfile(f_path) else TokenIndex()
+
+
+def save_index(index: TokenIndex, year: int) -> str:
+    f_path = get_index_path(year)
+    index.save(f_path)
+    return f_path
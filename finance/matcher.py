@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import finance.functions as f
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+np = f.lazy_import("numpy")
+pd = f.lazy_import("pandas")
+
+PATTERN_TYPES = ["Literal", "Word", "Regex"]
+DEFAULT_PATTERN_TYPE = "Literal"
+# number of patterns combined into one alternation pre-filter
+GROUP_SIZE = 200
+MAX_PATTERN_LENGTH = 500
+# smaller inputs are matched serially (worker start-up costs more)
+PARALLEL_MIN_ROWS = 20000
+# worker processes of a parallel match (None: one per CPU)
+WORKERS = None
+SHARDS_PER_WORKER = 4
+
+# Parser.transform prefixes transaction details with the date
+DATE_PREFIX = r"\d{4}-\d{2}-\d{2} "
+DATE_PREFIX_LENGTH = 11
+DATE_PREFIX_SEARCH = re.compile(f"(?={DATE_PREFIX})").finditer
+
+REPEAT_OPS = [sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT]
+BACKREF_OPS = [sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS]
+
+
+def get_pattern_type(pattern_type) -> str:
+    if pd.isnull(pattern_type) or pattern_type == "":
+        return DEFAULT_PATTERN_TYPE
+    if pattern_type not in PATTERN_TYPES:
+        raise ValueError(f"Invalid pattern type '{pattern_type}'")
+    return pattern_type
+
+
+def has_nested_repeat(items, in_repeat=False) -> bool:
+    for op, av in items:
+        if op in BACKREF_OPS:
+            return True
+        elif op in REPEAT_OPS:
+            unbounded = av[1] == sre_parse.MAXREPEAT
+            if unbounded and in_repeat:
+                return True
+            if has_nested_repeat(av[2], in_repeat or unbounded):
+                return True
+        elif op == sre_parse.SUBPATTERN:
+            if has_nested_repeat(av[-1], in_repeat):
+                return True
+        elif op == sre_parse.BRANCH:
+            if any(has_nested_repeat(b, in_repeat) for b in av[1]):
+                return True
+        elif op in [sre_parse.ASSERT, sre_parse.ASSERT_NOT]:
+            if has_nested_repeat(av[1], in_repeat):
+                return True
+    return False
+
+
+def check_regex(pattern: str):
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise ValueError(f"Regex pattern too long: '{pattern[:50]}...'")
+    try:
+        items = sre_parse.parse(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regex pattern '{pattern}': {e}")
+    # nested unbounded repeats like (a+)+ backtrack exponentially
+    if has_nested_repeat(items):
+        raise ValueError(
+            f"Unsafe regex pattern '{pattern}': "
+            f"nested repeats or back-references are not allowed"
+        )
+
+
+def get_regex_source(pattern: str, pattern_type: str) -> str:
+    if pattern_type == "Regex":
+        check_regex(pattern)
+        return pattern
+    elif pattern_type == "Word":
+        return f"(?<!\\w){re.escape(pattern)}(?!\\w)"
+    else:
+        return re.escape(pattern)
+
+
+def is_details_pattern(pattern) -> bool:
+    return isinstance(pattern, str) and re.match(DATE_PREFIX, pattern) is not None
+
+
+def get_literal_check(pattern: str):
+    return lambda text: pattern in text
+
+
+class PatternMatcher:
+    def __init__(self, patterns: list, pattern_types=None, group_size=GROUP_SIZE):
+        if pattern_types is None:
+            pattern_types = [DEFAULT_PATTERN_TYPE] * len(patterns)
+        self.patterns = [str(p) for p in patterns]
+        self.pattern_types = [get_pattern_type(t) for t in pattern_types]
+        self.group_size = group_size
+        self.sources = [
+            get_regex_source(p, t)
+            for p, t in zip(self.patterns, self.pattern_types)
+        ]
+        # literals are checked with `in`, everything else with its regex
+        self.checks = [
+            get_literal_check(p)
+            if t == "Literal"
+            else re.compile(s).search
+            for p, t, s in zip(self.patterns, self.pattern_types, self.sources)
+        ]
+        # details literals can only occur where the text has a date prefix,
+        # so they are looked up by that date instead of being scanned
+        self.details = {}
+        for i, (p, t) in enumerate(zip(self.patterns, self.pattern_types)):
+            if t == "Literal" and is_details_pattern(p):
+                self.details.setdefault(p[:DATE_PREFIX_LENGTH], []).append(i)
+        # texts equal to a details pattern (e.g. the transaction the pattern was
+        # taken from) skip the date lookup: their matches only depend on the
+        # pattern table, so they are computed once
+        self.exact = {
+            p: self.match_details(p)
+            for p, t in zip(self.patterns, self.pattern_types)
+            if t == "Literal" and is_details_pattern(p)
+        }
+        scanned = [
+            i
+            for i, (p, t) in enumerate(zip(self.patterns, self.pattern_types))
+            if not (t == "Literal" and is_details_pattern(p))
+        ]
+        self.groups = []
+        for start in range(0, len(scanned), group_size):
+            self.add_group(scanned[start:start + group_size])
+
+    @classmethod
+    def from_frame(cls, df_cat: pd.DataFrame, group_size=GROUP_SIZE):
+        pattern_types = (
+            list(df_cat["PatternType"]) if "PatternType" in df_cat.columns else None
+        )
+        return cls(list(df_cat["Pattern"]), pattern_types, group_size)
+
+    def add_group(self, positions: list):
+        if len(positions) == 1:
+            self.groups.append((self.checks[positions[0]], positions))
+            return
+        source = "|".join(f"(?:{self.sources[i]})" for i in positions)
+        try:
+            self.groups.append((re.compile(source).search, positions))
+        except re.error:
+            # e.g. inline flags are only allowed at the start of a pattern
+            for i in positions:
+                self.add_group([i])
+
+    def match_text(self, text) -> list:
+        if not isinstance(text, str):
+            return []
+        positions = []
+        for group_search, group_positions in self.groups:
+            if group_search(text):
+                positions.extend(i for i in group_positions if self.checks[i](text))
+        if self.details:
+            exact = self.exact.get(text)
+            positions.extend(self.match_details(text) if exact is None else exact)
+        return sorted(positions)
+
+    def match_details(self, text: str) -> list:
+        # details literals starting at a date prefix of the text
+        positions = []
+        for date_match in DATE_PREFIX_SEARCH(text):
+            start = date_match.start()
+            date_prefix = text[start:start + DATE_PREFIX_LENGTH]
+            positions.extend(
+                i
+                for i in self.details.get(date_prefix, [])
+                if text.startswith(self.patterns[i], start) and i not in positions
+            )
+        return positions
+
+    def match(self, details) -> list:
+        # positions of matching patterns (ascending) for each text
+        return [self.match_text(text) for text in details]
+
+
+# matcher of a pool worker, compiled once by init_worker
+worker_matcher = None
+
+
+def init_worker(patterns: list, pattern_types: list, group_size: int):
+    global worker_matcher
+    worker_matcher = PatternMatcher(patterns, pattern_types, group_size)
+
+
+def match_shard(details: list) -> list:
+    return worker_matcher.match(details)
+
+
+def match_parallel(matcher: PatternMatcher, details, workers=None) -> list:
+    # same result as matcher.match: contiguous shards are matched in a process
+    # pool & concatenated in order, the pattern table is sent once per worker
+    details = list(details)
+    workers = workers or WORKERS or os.cpu_count() or 1
+    if workers == 1 or len(details) < PARALLEL_MIN_ROWS:
+        return matcher.match(details)
+    shard_size = -(-len(details) // (workers * SHARDS_PER_WORKER))
+    shards = [details[start:start + shard_size] for start in range(0, len(details), shard_size)]
+    # spawn: forking a process with running threads (DAG stages) is unsafe
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(matcher.patterns, matcher.pattern_types, matcher.group_size),
+    ) as executor:
+        return list(itertools.chain.from_iterable(executor.map(match_shard, shards)))
+
+
+def resolve_categories(matches: list, priorities: list, categories: list) -> tuple:
+    # replays the priority rules on the matching patterns of every row:
+    # returns the winning pattern position per row (-1 if none or in
+    # conflict) and the (pattern position, row) pairs where two categories
+    # collide
+    winners = np.full(len(matches), -1)
+    conflicts = []
+    for row, positions in enumerate(matches):
+        priority, category = 1, ""
+        for pos in positions:
+            is_empty = category == ""
+            if priorities[pos] == priority and categories[pos] != category and not is_empty:
+                conflicts.append((pos, row))
+                winners[row] = -1
+                break
+            if is_empty or priority < priorities[pos] or categories[pos] == category:
+                winners[row] = pos
+                priority, category = priorities[pos], categories[pos]
+    return winners, conflicts
+
+
+class MatchIndex:
+    # sparse (CSR) matrix of transactions x matching patterns: the patterns
+    # of row i are indices[indptr[i]:indptr[i + 1]]
+    index_cols = ["Pattern", "PatternType", "CategoryName", "Priority"]
+
+    def __init__(self, details: list, df_cat: pd.DataFrame, matches: list):
+        self.details = list(details)
+        self.df_cat = df_cat.reset_index(drop=True)
+        if "PatternType" not in self.df_cat.columns:
+            self.df_cat["PatternType"] = DEFAULT_PATTERN_TYPE
+        lengths = [len(positions) for positions in matches]
+        self.indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        self.indices = np.fromiter(
+            itertools.chain.from_iterable(matches),
+            dtype=np.int64,
+            count=int(self.indptr[-1]),
+        )
+        self.winners, self.conflicts = resolve_categories(
+            matches,
+            list(self.df_cat["Priority"]),
+            list(self.df_cat["CategoryName"]),
+        )
+
+    def get_patterns(self, row: int) -> list:
+        return list(self.indices[self.indptr[row]:self.indptr[row + 1]])
+
+    def explain(self, row: int) -> pd.DataFrame:
+        positions = self.get_patterns(row)
+        df = self.df_cat.loc[positions, MatchIndex.index_cols].copy()
+        df["Winner"] = df.index == self.winners[row]
+        return df
+
+    def get_hit_counts(self) -> pd.DataFrame:
+        df = self.df_cat[MatchIndex.index_cols].copy()
+        n_patterns = len(df.index)
+        df["Hits"] = np.bincount(self.indices, minlength=n_patterns)
+        df["Wins"] = np.bincount(
+            self.winners[self.winners >= 0], minlength=n_patterns
+        )
+        return df
+
+    def get_unused_patterns(self) -> pd.DataFrame:
+        df = self.get_hit_counts()
+        return df[df["Hits"] == 0]
+
+    def get_shadowed_patterns(self) -> pd.DataFrame:
+        # patterns that match transactions but never decide the category
+        df = self.get_hit_counts()
+        return df[(df["Hits"] > 0) & (df["Wins"] == 0)]
+
+    def get_conflicts(self) -> pd.DataFrame:
+        # every pattern with the colliding priority for each conflicting row
+        dfs = []
+        for pos, row in self.conflicts:
+            df = self.explain(row)
+            df = df[df["Priority"] == self.df_cat.loc[pos, "Priority"]]
+            df.insert(0, "Details", self.details[row])
+            df.insert(0, "Row", row)
+            dfs.append(df.drop(columns=["Winner"]))
+        if len(dfs) == 0:
+            return pd.DataFrame(columns=["Row", "Details"] + MatchIndex.index_cols)
+        return pd.concat(dfs, ignore_index=True)
+
+    def save(self, f_path: str):
+        np.savez_compressed(
+            f_path,
+            details=np.array(self.details, dtype=str),
+            indptr=self.indptr,
+            indices=self.indices,
+            **{
+                col: self.df_cat[col].to_numpy(
+                    dtype=float if col == "Priority" else str
+                )
+                for col in MatchIndex.index_cols
+            },
+        )
+
+    @classmethod
+    def load(cls, f_path: str):
+        with np.load(f_path) as data:
+            df_cat = pd.DataFrame({col: data[col] for col in MatchIndex.index_cols})
+            indptr, indices = data["indptr"], data["indices"]
+            matches = [
+                list(indices[indptr[row]:indptr[row + 1]])
+                for row in range(len(indptr) - 1)
+            ]
+            return cls(list(data["details"]), df_cat, matches)
@@ -1,14 +1,37 @@
 #!/usr/bin/env python
+from __future__ import annotations
 
-import pandas as pd
+import os.path
+import re
+import time
 
+import finance.cache as cache
 import finance.dataframe as d
 import finance.functions as f
+import finance.table as tb
+
+np = f.lazy_import("numpy")
+pd = f.lazy_import("pandas")
+
+# columns identifying the same transaction in overlapping exports
+COLS_DUPLICATE = ["Account", "Date", "Amount", "Currency", "Details"]
+COLS_REPORT = [
+    "File", "Parser", "Bytes", "RowsIn", "RowsOut", "ReadTime", "TransformTime",
+    "ValidateTime", "TotalTime", "FrameBytesIn", "FrameBytesDelta", "Slow",
+]
+# rows listed per violation (the table shows how many there are)
+MAX_VIOLATION_ROWS = 5
+# files taking longer (read + transform + validate) are flagged as slow
+SLOW_SECONDS = 5.0
 
 
 class Parser:
 
     col_names = ["Date", "Account", "Amount", "Currency", "Details"]
+    # raw column -> column name used by transform (None reads every column)
+    read_columns = None
+    # column sets of the bank's export files (format detection)
+    headers = [["Date", "Amount", "Currency", "Details"]]
 
     def __init__(
         self,
@@ -19,9 +42,16 @@ class Parser:
 
         self.year = year
         self.file_name = file_name
-        self.account_name = file_name.split(".")[0]
+        # overlapping downloads like "HSBC_Checking (1).csv" share the account
+        self.account_name = re.sub(r"\s*\(\d+\)$", "", file_name.split(".")[0])
         self.currency = currency
 
+    @classmethod
+    def get_required_columns(cls) -> set:
+        if cls.read_columns is not None:
+            return set(cls.read_columns)
+        return set.intersection(*[set(header) for header in cls.headers])
+
     def get_path(self):
         return f.get_path(self.year, "input", self.file_name)
 
@@ -29,12 +59,21 @@ class Parser:
         f_path = self.get_path()
         ext = f_path.split(".")[-1]
         # print(f_path)
+        # unused columns are skipped by the reader instead of dropped later
+        usecols = (
+            None
+            if self.read_columns is None
+            else lambda col: col.strip() in self.read_columns
+        )
         df = (
-            pd.read_csv(f_path, encoding="utf-8", thousands=",")
+            pd.read_csv(f_path, encoding="utf-8", thousands=",", usecols=usecols)
             if ext == "csv"
-            else pd.read_excel(f_path, thousands=",")
+            else pd.read_excel(f_path, thousands=",", usecols=usecols)
         )
         df = d.strip_col_names(df)
+        if self.read_columns is not None:
+            # rename in place (df.rename would copy the frame)
+            df.columns = [self.read_columns[col] for col in df.columns]
         return df
 
     def transform(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -51,23 +90,15 @@ class Parser:
         df = d.replace_value(df, "Details", "\\s{2,}", " ", regex=True)
         return df
 
+    def get_violations(self, df: pd.DataFrame) -> pd.DataFrame:
+        return d.get_violations(df, Parser.col_names, year=self.year)
+
     def validate(self, df: pd.DataFrame):
-        # is not empty
-        if len(df.index) == 0:
-            raise ValueError("Empty dataframe!")
-        # has mandatory column
-        d.has_columns(df, Parser.col_names, raise_error=True)
-        # has no extra column
-        if len(df.columns) > len(Parser.col_names):
-            raise ValueError("Extra columns found in dataframe!")
-        # has no missing values
-        for col in df.columns:
-            d.has_missing_values(df, col, raise_error=True)
-        # contains data for current year only
-        years = list(set(pd.DatetimeIndex(df["Date"]).year))
-        for year in years:
-            if year != self.year:
-                raise ValueError(f"Invalid year {year} found in data!")
+        # empty, schema, missing values & year range in one pass
+        df_violations = self.get_violations(df)
+        if len(df_violations.index) > 0:
+            show_violations(df_violations, f"Violations in {self.file_name}")
+            raise ValueError(df_violations.loc[0, "Message"])
 
     def parse(self):
         df = self.read()
@@ -89,6 +120,21 @@ class Parser:
 
 
 class UnicreditParser(Parser):
+    read_columns = {
+        "Státusz": "Státusz",
+        "Összeg": "Összeg",
+        "Érték Dátum": "Date",
+        "Partner": "Partner",
+        "Partner Számlaszám": "Partner Számlaszám",
+        "Tranzakció részletek": "Tranzakció részletek",
+    }
+    headers = [[
+        "Számlaszám", "Összeg", "Eredeti összeg", "Státusz", "Érték Dátum", "Partner Számlaszám", "Partner",
+        "****XLS_REPORT_LABELS.beneficiarySecondaryIdentifier****", "Tranzakció részletek", "Tranzakció típusa",
+        "Fx rate", "TPP registration number", "TPP name", "TPP payment reference", "Country of registration",
+        "National Authority Code",
+    ]]
+
     def __init__(self, year: int, file_name: str):
         super(UnicreditParser, self).__init__(year, file_name, currency="HUF")
 
@@ -105,7 +151,6 @@ class UnicreditParser(Parser):
         df = d.replace_value(df, column="Amount", value_from=",", value_to=".")
         df = d.convert_type(df, column="Amount", col_type="float")
         # convert Date
-        df = d.rename_column(df, column_old="Érték Dátum", column_new="Date")
         df = d.format_date(df, column="Date", date_format="%Y.%m.%d")
         # get transaction Details
         df = d.merge_columns(
@@ -123,6 +168,14 @@ class UnicreditParser(Parser):
 
 
 class CapitalOneParser(Parser):
+    read_columns = {
+        "Posted Date": "Date",
+        "Description": "Details",
+        "Debit": "Debit",
+        "Credit": "Credit",
+    }
+    headers = [["Transaction Date", "Posted Date", "Card No.", "Description", "Category", "Debit", "Credit"]]
+
     def transform(self, df) -> pd.DataFrame:
         # convert Amount
         cols = ["Debit", "Credit"]
@@ -130,34 +183,36 @@ class CapitalOneParser(Parser):
         df = d.multiple_column(df, column="Debit", multiplier=-1)
         df = d.summarize_columns(df, column="Amount", col_list=cols)
         # convert Date
-        df = d.rename_column(df, column_old="Posted Date", column_new="Date")
         df = d.format_date(df, column="Date", date_format="%Y-%m-%d")
-        # get transaction Details
-        df = d.rename_column(
-            df, column_old="Description", column_new="Details"
-        )
         # default data transforms
         df = super(CapitalOneParser, self).transform(df)
         return df
 
 
 class CapitalOneSavingsParser(Parser):
+    read_columns = {
+        "Transaction Date": "Date",
+        "Transaction Amount": "Amount",
+        "Transaction Description": "Details",
+    }
+    headers = [[
+        "Account Number", "Transaction Date", "Transaction Amount", "Transaction Type", "Transaction Description",
+        "Balance",
+    ]]
+
     def transform(self, df) -> pd.DataFrame:
-        # convert Amount
-        df = d.rename_column(df, column_old="Transaction Amount", column_new="Amount")
         # convert Date
-        df = d.rename_column(df, column_old="Transaction Date", column_new="Date")
         df = d.format_date(df, column="Date", date_format="%m/%d/%y")
-        # get transaction Details
-        df = d.rename_column(
-            df, column_old="Transaction Description", column_new="Details"
-        )
         # default data transforms
         df = super(CapitalOneSavingsParser, self).transform(df)
         return df
 
 
 class HSBCParser(Parser):
+    read_columns = {"Date": "Date", "Details": "Details", "Amount": "Amount"}
+    # checking & savings accounts
+    headers = [["Date", "Details", "Amount", "Balance"]]
+
     def transform(self, df) -> pd.DataFrame:
         # convert Date
         df = d.format_date(df, column="Date", date_format="%m/%d/%Y")
@@ -167,6 +222,8 @@ class HSBCParser(Parser):
 
 
 class HSBCMasterCardParser(HSBCParser):
+    headers = [["Date", "Details", "Amount"]]
+
     def transform(self, df) -> pd.DataFrame:
         # convert Amount
         df = d.replace_value(df, "Amount", value_from="--", value_to="-")
@@ -178,6 +235,21 @@ class HSBCMasterCardParser(HSBCParser):
 
 
 class WiseParser(Parser):
+    read_columns = {
+        "Date": "Date",
+        "Amount": "Amount",
+        "Currency": "Currency",
+        "Description": "Description",
+        "Payment Reference": "Payment Reference",
+        "Payee Name": "Payee Name",
+        "Payee Account Number": "Payee Account Number",
+    }
+    headers = [[
+        "TransferWise ID", "Date", "Amount", "Currency", "Description", "Payment Reference", "Running Balance",
+        "Exchange From", "Exchange To", "Exchange Rate", "Payer Name", "Payee Name", "Payee Account Number",
+        "Merchant", "Card Last Four Digits", "Card Holder Full Name", "Attachment", "Note", "Total fees",
+    ]]
+
     def transform(self, df) -> pd.DataFrame:
         # get transaction Details
         df = d.merge_columns(
@@ -197,24 +269,161 @@ class WiseParser(Parser):
         return df
 
 
+def show_violations(df_violations: pd.DataFrame, title: str):
+    # one line per violation, with the number & first labels of its rows
+    table = tb.Table(title, ["Check", "Column", "Count", "Rows", "Message"], {"Count": "d"})
+    for check, column, rows, message in df_violations[d.COLS_VIOLATION].itertuples(index=False, name=None):
+        first_rows = ", ".join(map(str, rows[:MAX_VIOLATION_ROWS]))
+        if len(rows) > MAX_VIOLATION_ROWS:
+            first_rows += ", ..."
+        table.add(check, column, len(rows), first_rows, message)
+    table.show()
+
+
+PARSERS = [
+    UnicreditParser,
+    CapitalOneSavingsParser,
+    CapitalOneParser,
+    HSBCMasterCardParser,
+    HSBCParser,
+    WiseParser,
+    Parser,
+]
+# file name prefix -> parser class (first match)
+FILE_PREFIXES = [
+    ("Unicredit", UnicreditParser),
+    ("Cash", Parser),
+    ("CapitalOne_Savings", CapitalOneSavingsParser),
+    ("CapitalOne", CapitalOneParser),
+    ("HSBC_Mastercard", HSBCMasterCardParser),
+    ("HSBC", HSBCParser),
+    ("Wise", WiseParser),
+]
+# header fingerprint -> detected parser class (None if unknown or ambiguous)
+FINGERPRINTS = {}
+
+
+def read_header(f_path: str) -> list:
+    ext = f_path.split(".")[-1]
+    df = (
+        pd.read_csv(f_path, encoding="utf-8", nrows=0)
+        if ext == "csv"
+        else pd.read_excel(f_path, nrows=0)
+    )
+    # e.g. trailing separators add unnamed columns
+    return [col.strip() for col in df.columns if not col.startswith("Unnamed:")]
+
+
+def match_parser_class(fingerprint: frozenset):
+    for parser_class in PARSERS:
+        if any(fingerprint == frozenset(header) for header in parser_class.headers):
+            return parser_class
+    # e.g. the bank added a column: the most specific format whose columns
+    # are all present
+    candidates = [
+        parser_class
+        for parser_class in PARSERS
+        if parser_class.get_required_columns() <= fingerprint
+    ]
+    if len(candidates) == 0:
+        return None
+    n_required = [len(parser_class.get_required_columns()) for parser_class in candidates]
+    candidates = [c for c, n in zip(candidates, n_required) if n == max(n_required)]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def detect_parser_class(f_path: str):
+    # only the header row is read, the parser class is cached per column set
+    try:
+        fingerprint = frozenset(read_header(f_path))
+    except Exception:
+        # unreadable header: fall back to the file name
+        return None
+    if fingerprint not in FINGERPRINTS:
+        FINGERPRINTS[fingerprint] = match_parser_class(fingerprint)
+    return FINGERPRINTS[fingerprint]
+
+
+def get_file_name_parser_class(file_name: str):
+    for prefix, parser_class in FILE_PREFIXES:
+        if file_name.startswith(prefix):
+            return parser_class
+    return None
+
+
+@cache.file_cache(lambda year, file_name: [f.get_path(year, "input", file_name)])
 def get_parser_object(year: int, file_name: str) -> Parser:
-
-    if file_name.startswith("Unicredit"):
-        return UnicreditParser(year, file_name)
-    elif file_name.startswith("Cash"):
-        return Parser(year, file_name)
-    elif file_name.startswith("CapitalOne_Savings"):
-        return CapitalOneSavingsParser(year, file_name)
-    elif file_name.startswith("CapitalOne"):
-        return CapitalOneParser(year, file_name)
-    elif file_name.startswith("HSBC_Mastercard"):
-        return HSBCMasterCardParser(year, file_name)
-    elif file_name.startswith("HSBC"):
-        return HSBCParser(year, file_name)
-    elif file_name.startswith("Wise"):
-        return WiseParser(year, file_name)
-    else:
+    # the file name decides (formats like HSBC checking & MasterCard only
+    # differ by optional columns), the header only for unknown names
+    f_path = f.get_path(year, "input", file_name)
+    parser_class = get_file_name_parser_class(file_name)
+    detected_class = detect_parser_class(f_path) if os.path.isfile(f_path) else None
+    if parser_class is None:
+        parser_class = detected_class
+    elif detected_class is not None and detected_class is not parser_class:
+        print(
+            f"Parse transactions: '{file_name}' has a {detected_class.__name__} header, "
+            f"parsed as {parser_class.__name__} by its name"
+        )
+    if parser_class is None:
         raise ValueError(f'Cannot find parser object for "{file_name}"')
+    return parser_class(year, file_name)
+
+
+def parse_file(parser: Parser, df_raw=None, read_time=None) -> tuple:
+    # parse one file & measure each step (the raw frame might have been read
+    # already, e.g. by pipeline.parse_transactions), returns the frame & its
+    # report row
+    if df_raw is None:
+        start = time.perf_counter()
+        df_raw = parser.read()
+        read_time = time.perf_counter() - start
+    rows_in = len(df_raw.index)
+    # size of the raw & parsed frames (not the memory of the process)
+    bytes_in = int(df_raw.memory_usage(deep=True).sum())
+    start = time.perf_counter()
+    df = parser.transform(df_raw)
+    transform_time = time.perf_counter() - start
+    start = time.perf_counter()
+    parser.validate(df)
+    validate_time = time.perf_counter() - start
+    f_path = parser.get_path()
+    report = {
+        "File": parser.file_name,
+        "Parser": parser.__class__.__name__,
+        "Bytes": os.path.getsize(f_path) if os.path.exists(f_path) else None,
+        "RowsIn": rows_in,
+        "RowsOut": len(df.index),
+        "ReadTime": read_time,
+        "TransformTime": transform_time,
+        "ValidateTime": validate_time,
+        "FrameBytesIn": bytes_in,
+        "FrameBytesDelta": int(df.memory_usage(deep=True).sum()) - bytes_in,
+    }
+    return df, report
+
+
+def get_report(reports: list, slow_seconds=SLOW_SECONDS) -> pd.DataFrame:
+    df_report = pd.DataFrame(reports, columns=COLS_REPORT)
+    df_report["TotalTime"] = df_report[["ReadTime", "TransformTime", "ValidateTime"]].sum(axis=1)
+    df_report["Slow"] = df_report["TotalTime"] > slow_seconds
+    table = tb.Table(
+        f"Parse transactions (slow > {slow_seconds}s)",
+        ["File", "Parser", "RowsIn", "RowsOut", "TotalTime", "Slow"],
+        {"RowsIn": "d", "RowsOut": "d", "TotalTime": ".2f"},
+    )
+    table.extend({
+        **{col: df_report[col].tolist() for col in table.columns},
+        "Slow": ["slow" if slow else "" for slow in df_report["Slow"]],
+    })
+    table.show()
+    return df_report
+
+
+def save_report(df_report: pd.DataFrame, year: int) -> str:
+    f_path = f.get_path(year, "output", "ingestion.csv")
+    df_report.to_csv(f_path, index=False)
+    return f_path
 
 
 def parse_transaction_file(year: int, file_name: str) -> pd.DataFrame:
@@ -223,17 +432,62 @@ def parse_transaction_file(year: int, file_name: str) -> pd.DataFrame:
     return df
 
 
+def drop_duplicate_transactions(dfs: list, file_names: list) -> tuple:
+    # rows of a file that another (overlapping) export already contains;
+    # identical rows within one file are separate transactions, so the n-th
+    # occurrence in a file only duplicates the n-th occurrence in another
+    if len(dfs) == 0:
+        return pd.DataFrame(), pd.DataFrame()
+    df = pd.concat(dfs)
+    if not d.has_columns(df, COLS_DUPLICATE):
+        return df, df.iloc[:0]
+    df_keys = pd.DataFrame({
+        "File": np.repeat(np.arange(len(dfs)), [len(df_file.index) for df_file in dfs]),
+        "Hash": pd.util.hash_pandas_object(
+            df[COLS_DUPLICATE].astype({"Amount": float}), index=False
+        ).to_numpy(),
+    })
+    df_keys["Occurrence"] = df_keys.groupby(["File", "Hash"]).cumcount()
+    is_duplicate = df_keys.duplicated(["Hash", "Occurrence"]).to_numpy()
+    df_removed = df[is_duplicate].copy()
+    df_removed.insert(0, "File", [file_names[i] for i in df_keys["File"][is_duplicate]])
+    if len(df_removed.index) > 0:
+        df_files = df_removed.groupby("File", sort=False)["Date"].agg(["size", "min", "max"])
+        table = tb.Table("Drop duplicate transactions", ["File", "Rows", "From", "To"], {"Rows": "d"})
+        table.extend({
+            "File": df_files.index.tolist(),
+            "Rows": df_files["size"].tolist(),
+            "From": df_files["min"].astype(str).tolist(),
+            "To": df_files["max"].astype(str).tolist(),
+        })
+        table.show()
+    return df[~is_duplicate], df_removed
+
+
 def parse_transactions(year: int) -> pd.DataFrame:
-    df_all = pd.DataFrame()
+    df, _ = parse_transactions_with_report(year)
+    return df
+
+
+def parse_transactions_with_report(year: int, slow_seconds=SLOW_SECONDS, save=False) -> tuple:
+    # parsed transactions & the ingestion report (one row per file)
+    dfs = []
+    file_names = []
+    reports = []
     transaction_files = f.get_transaction_files(year)
-    print("Parse transactions:")
     for transaction_file in transaction_files:
-        print(f"-- {transaction_file}")
         if not transaction_file.startswith(".~lock"):
-            df_new = parse_transaction_file(year, transaction_file)
-            df_all = (
-                df_new
-                if df_all.empty
-                else pd.concat([df_all, df_new])
-            )
-    return df_all
+            try:
+                df, report = parse_file(get_parser_object(year, transaction_file))
+            except Exception:
+                # the report of the parsed files is only shown at the end
+                print(f"Parse transactions: '{transaction_file}' failed")
+                raise
+            dfs.append(df)
+            file_names.append(transaction_file)
+            reports.append(report)
+    df_all, _ = drop_duplicate_transactions(dfs, file_names)
+    df_report = get_report(reports, slow_seconds)
+    if save:
+        save_report(df_report, year)
+    return df_all, df_report
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import asyncio
+import time
+
+import finance.categorize as c
+import finance.dag as dag
+import finance.functions as f
+import finance.index as ix
+import finance.parser as p
+import finance.report as r
+import finance.validate as v
+
+pd = f.lazy_import("pandas")
+
+# number of raw files read ahead of the transform step
+PREFETCH = 2
+# file engines used by several stages at once
+PRELOAD = ["pandas", "openpyxl", "xlrd", "pyarrow"]
+
+
+def read_file(parser: p.Parser) -> tuple:
+    # timed on the executor thread, so waiting in the queue isn't counted
+    start = time.perf_counter()
+    df_raw = parser.read()
+    return df_raw, time.perf_counter() - start
+
+
+async def read_files(parsers: list, queue: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+    for parser in parsers:
+        try:
+            df_raw, read_time = await loop.run_in_executor(None, read_file, parser)
+        except Exception as e:
+            await queue.put((parser, e, None))
+            return
+        await queue.put((parser, df_raw, read_time))
+
+
+async def parse_transactions(year: int, prefetch=PREFETCH, slow_seconds=p.SLOW_SECONDS) -> tuple:
+    transaction_files = f.get_transaction_files(year)
+    parsers = [
+        p.get_parser_object(year, transaction_file)
+        for transaction_file in transaction_files
+        if not transaction_file.startswith(".~lock")
+    ]
+
+    # read files on the executor while earlier files are transformed
+    queue = asyncio.Queue(maxsize=prefetch)
+    reader = asyncio.ensure_future(read_files(parsers, queue))
+    dfs = []
+    reports = []
+    try:
+        for _ in parsers:
+            parser, df_raw, read_time = await queue.get()
+            try:
+                if isinstance(df_raw, Exception):
+                    raise df_raw
+                df, report = p.parse_file(parser, df_raw, read_time)
+            except Exception:
+                # the report of the parsed files is only shown at the end
+                print(f"Parse transactions: '{parser.file_name}' failed")
+                raise
+            dfs.append(df)
+            reports.append(report)
+    finally:
+        reader.cancel()
+    df, _ = p.drop_duplicate_transactions(dfs, [parser.file_name for parser in parsers])
+    return df, p.get_report(reports, slow_seconds)
+
+
+def fx_rates_stage(year: int, artifacts: dict) -> dict:
+    return v.get_fx_rates(year)
+
+
+def balance_stage(year: int, artifacts: dict) -> pd.DataFrame:
+    df_balance = r.summarize_balance(year, artifacts["fx_rates"])
+    df_balance.to_excel(f.get_path(year, "output", "balance.xlsx"), index=False)
+    return df_balance
+
+
+def categories_stage(year: int, artifacts: dict) -> pd.DataFrame:
+    return c.parse_categories_from_transactions(year)
+
+
+def parse_stage(year: int, artifacts: dict) -> pd.DataFrame:
+    df, df_report = asyncio.run(parse_transactions(year))
+    p.save_report(df_report, year)
+    return df
+
+
+def categorize_stage(year: int, artifacts: dict) -> pd.DataFrame:
+    # the details index of the last run only indexes texts of new transactions
+    return c.match_existing_categories(
+        artifacts["parse"].copy(), artifacts["categories"], year, save_matches=True, token_index=ix.load_index(year)
+    )
+
+
+def validate_stage(year: int, artifacts: dict):
+    v.check_monthly_balances(artifacts["categorize"], year)
+
+
+def summarize_stage(year: int, artifacts: dict) -> pd.DataFrame:
+    df, df_sum = r.summarize_months(year, artifacts["categorize"].copy(), artifacts["fx_rates"])
+    r.save_results(df=df, df_sum=df_sum, f_path=f.get_path(year, "output", "summary.xlsx"))
+    return df
+
+
+def balance_sheets_stage(year: int, artifacts: dict):
+    df_sheets = r.get_balance_sheets(year, artifacts["categorize"], artifacts["fx_rates"])
+    r.save_balance_sheets(df_sheets, f.get_path(year, "output", "balance_sheets.xlsx"))
+
+
+def pnl_stage(year: int, artifacts: dict):
+    r.get_pnl(year, artifacts["summarize"].copy())
+
+
+STAGES = [
+    dag.Stage("fx_rates", fx_rates_stage, files=[("settings", "fx_rates.json")]),
+    dag.Stage(
+        "balance",
+        balance_stage,
+        files=[("settings", "accounts.csv")],
+        upstream=["fx_rates"],
+        outputs=[("output", "balance.xlsx")],
+    ),
+    dag.Stage("categories", categories_stage, files=[("output", "transactions.xlsx")]),
+    dag.Stage("parse", parse_stage, files=[("input", None)], outputs=[("output", "ingestion.csv")]),
+    dag.Stage(
+        "categorize",
+        categorize_stage,
+        upstream=["parse", "categories"],
+        outputs=[
+            ("output", "transactions.xlsx"),
+            ("output", "transactions.arrow"),
+            ("output", "matches.npz"),
+            ("output", "transactions.index.npz"),
+        ],
+    ),
+    dag.Stage(
+        "validate",
+        validate_stage,
+        files=[("settings", "balances.csv"), ("settings", "accounts.csv")],
+        upstream=["categorize"],
+    ),
+    dag.Stage(
+        "summarize",
+        summarize_stage,
+        upstream=["categorize", "validate", "fx_rates"],
+        outputs=[("output", "summary.xlsx")],
+    ),
+    dag.Stage(
+        "balance_sheets",
+        balance_sheets_stage,
+        files=[("settings", "accounts.csv")],
+        upstream=["categorize", "fx_rates"],
+        outputs=[("output", "balance_sheets.xlsx")],
+    ),
+    dag.Stage(
+        "pnl",
+        pnl_stage,
+        files=[("settings", "category_groups.csv")],
+        upstream=["summarize"],
+        outputs=[("output", "pnl.xlsx")],
+    ),
+]
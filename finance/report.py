@@ -1,12 +1,27 @@
 #!/usr/bin/env python
-import os
+from __future__ import annotations
 
-import pandas as pd
+import os
 
 import finance.dataframe as d
+import finance.functions as f
 import finance.validate as v
 import typing as t
 
+np = f.lazy_import("numpy")
+pd = f.lazy_import("pandas")
+
+MONTHS = 12
+COLS_BALANCE_SHEET = ["AccountType", "AccountCategory", "Account", "Currency", "Month", "Balance"]
+# P&L groupings of the categories: the first row of a grouping whose prefix
+# starts the category name gives its group, an empty prefix matches any name
+DEFAULT_CATEGORY_GROUPS = [
+    {"Grouping": "LivingExpense", "Prefix": "Savings", "Group": False},
+    {"Grouping": "LivingExpense", "Prefix": "Donation", "Group": False},
+    {"Grouping": "LivingExpense", "Prefix": "Sunk Costs", "Group": False},
+    {"Grouping": "LivingExpense", "Prefix": "", "Group": True},
+]
+
 
 def summarize_transactions(df: pd.DataFrame):
     d.has_column(df, "Date", raise_error=True)
@@ -30,11 +45,12 @@ def summarize_categories(df: pd.DataFrame):
     return df_cat
 
 
-def add_usd_amount(year: int, df: pd.DataFrame):
+def add_usd_amount(year: int, df: pd.DataFrame, fx_rates=None):
     d.has_column(df, "Amount", raise_error=True)
     d.has_column(df, "Currency", raise_error=True)
 
-    fx_rates = v.get_fx_rates(year)
+    if fx_rates is None:
+        fx_rates = v.get_fx_rates(year)
 
     def convert_to_usd(row: pd.Series):
         amount = row["Amount"]
@@ -45,8 +61,8 @@ def add_usd_amount(year: int, df: pd.DataFrame):
     return df
 
 
-def summarize_months(year: int, df: pd.DataFrame):
-    df = add_usd_amount(year, df)
+def summarize_months(year: int, df: pd.DataFrame, fx_rates=None):
+    df = add_usd_amount(year, df, fx_rates)
     d.has_column(df, "Date", raise_error=True)
     df["Month"] = pd.DatetimeIndex(df["Date"]).month
     df.sort_values(by=["Date"], inplace=True, ignore_index=True)
@@ -54,32 +70,120 @@ def summarize_months(year: int, df: pd.DataFrame):
     return df, df_sum
 
 
-def get_balance(year: int):
-    import finance.functions as f
-
+def summarize_balance(year: int, fx_rates=None) -> pd.DataFrame:
     df = d.parse_csv(year, "settings", "accounts.csv")
     df.rename(columns={"InitialBalance": "Amount"}, inplace=True)
-    df = add_usd_amount(year, df)
+    df = add_usd_amount(year, df, fx_rates)
     df["AmountUSD"] = df["AmountUSD"].round()
     del df['Amount']
     df_balance = df.groupby(["AccountType", "AccountCategory"]).sum()
-    f_path = f.get_path(year, "output", "balance.xlsx")
-    df_balance.reset_index().to_excel(f_path, index=False)
+    return df_balance.reset_index()
 
 
-def get_pnl(year: int, df: pd.DataFrame):
-    import finance.functions as f
-
-    df["LivingExpense"] = ~df["CategoryName"].str.startswith("Savings") & \
-                          ~df["CategoryName"].str.startswith("Donation") & \
-                          ~df["CategoryName"].str.startswith("Sunk Costs")
+def get_balance(year: int):
+    df_balance = summarize_balance(year)
+    f_path = f.get_path(year, "output", "balance.xlsx")
+    df_balance.to_excel(f_path, index=False)
+
+
+def get_balance_sheets(year: int, df: pd.DataFrame, fx_rates=None) -> pd.DataFrame:
+    # end of month balance of every account (initial balance + transactions
+    # until the end of the month), revalued in every currency of fx_rates.json
+    d.has_columns(df, ["Account", "Currency", "Amount", "Date"], raise_error=True)
+    if fx_rates is None:
+        fx_rates = v.get_fx_rates(year)
+    df_acc = d.parse_csv(year, "settings", "accounts.csv")
+    d.has_columns(df_acc, COLS_BALANCE_SHEET[:4] + ["InitialBalance"], raise_error=True)
+
+    # account of each transaction
+    accounts = pd.MultiIndex.from_frame(df_acc[["Account", "Currency"]])
+    rows = accounts.get_indexer(pd.MultiIndex.from_frame(df[["Account", "Currency"]]))
+    if (rows < 0).any():
+        account, ccy = df.loc[rows < 0, ["Account", "Currency"]].iloc[0]
+        raise ValueError(f"Account '{account}' ({ccy}) not found in 'accounts.csv'!")
+    currencies = list(fx_rates)
+    ccy_cols = pd.Index(currencies).get_indexer(df_acc["Currency"])
+    if (ccy_cols < 0).any():
+        raise ValueError(f"No FX rate found for '{df_acc['Currency'][ccy_cols < 0].iloc[0]}'")
+
+    # positions (accounts x months): initial balances + cumulated monthly flows
+    n_accounts = len(df_acc.index)
+    flows = np.zeros((n_accounts, MONTHS))
+    months = pd.DatetimeIndex(df["Date"]).month.to_numpy() - 1
+    np.add.at(flows, (rows, months), df["Amount"].to_numpy(dtype=float))
+    positions = df_acc["InitialBalance"].to_numpy(dtype=float)[:, None] + flows.cumsum(axis=1)
+
+    # positions by currency (accounts x months x currencies) times the
+    # conversion matrix (rate of the row currency / rate of the column currency)
+    rates = np.array([fx_rates[ccy] for ccy in currencies], dtype=float)
+    by_ccy = np.zeros((n_accounts, MONTHS, len(currencies)))
+    by_ccy[np.arange(n_accounts), :, ccy_cols] = positions
+    values = by_ccy @ (rates[:, None] / rates[None, :])
+
+    df_sheets = df_acc.loc[np.repeat(np.arange(n_accounts), MONTHS), COLS_BALANCE_SHEET[:4]].reset_index(drop=True)
+    df_sheets["Month"] = np.tile(np.arange(1, MONTHS + 1), n_accounts)
+    df_sheets["Balance"] = positions.reshape(-1).round(2)
+    df_values = pd.DataFrame(values.reshape(-1, len(currencies)).round(2), columns=currencies)
+    return pd.concat([df_sheets, df_values], axis=1)
+
+
+def consolidate_balance_sheets(df_sheets: pd.DataFrame) -> pd.DataFrame:
+    # monthly balance sheet by account type & category in every currency
+    currencies = [col for col in df_sheets.columns if col not in COLS_BALANCE_SHEET]
+    df_cons = df_sheets.groupby(["Month", "AccountType", "AccountCategory"])[currencies].sum()
+    return df_cons.round(2).reset_index()
+
+
+def save_balance_sheets(df_sheets: pd.DataFrame, f_path: str):
+    with pd.ExcelWriter(f_path) as writer:
+        consolidate_balance_sheets(df_sheets).to_excel(writer, sheet_name="Consolidated", index=False)
+        df_sheets.to_excel(writer, sheet_name="Accounts", index=False)
+
+
+def read_category_groups(year: int) -> list:
+    # settings/category_groups.csv is optional
+    if not os.path.isfile(f.get_path(year, "settings", "category_groups.csv")):
+        return DEFAULT_CATEGORY_GROUPS
+    rows = v.read_settings_csv(year, "category_groups.csv", v.COLS_CATEGORY_GROUP)
+    # True / False groups stay booleans like the default LivingExpense
+    booleans = {"True": True, "False": False}
+    return [{**row, "Group": booleans.get(row["Group"], row["Group"])} for row in rows]
+
+
+def add_category_groups(df: pd.DataFrame, category_groups: list) -> list:
+    # groups are resolved once per unique category name & mapped back to the
+    # rows by their codes (categories without a group get "")
+    d.has_column(df, "CategoryName", raise_error=True)
+    codes, categories = pd.factorize(df["CategoryName"])
+    rules = {}
+    for row in category_groups:
+        rules.setdefault(row["Grouping"], []).append((row["Prefix"], row["Group"]))
+    for grouping, grouping_rules in rules.items():
+        groups = [
+            next((group for prefix, group in grouping_rules if str(category).startswith(prefix)), "")
+            for category in categories
+        ]
+        values = np.empty(len(groups) + 1, dtype=object)
+        values[:-1] = groups
+        values[-1] = ""
+        df[grouping] = pd.Series(values[codes], index=df.index).infer_objects()
+    return list(rules)
+
+
+def summarize_pnl(df: pd.DataFrame, category_groups=None) -> pd.DataFrame:
+    groupings = add_category_groups(df, DEFAULT_CATEGORY_GROUPS if category_groups is None else category_groups)
     df_avg = df.pivot_table(
-        index=["CategoryType", "LivingExpense", "CategoryName"],
+        index=["CategoryType"] + groupings + ["CategoryName"],
         values=["AmountUSD"],
         aggfunc="sum",
     )
     months = len(df["Month"].unique())
     df_avg["AmountUSD"] = abs(round(df_avg["AmountUSD"] / months))
+    return df_avg
+
+
+def get_pnl(year: int, df: pd.DataFrame):
+    df_avg = summarize_pnl(df, read_category_groups(year))
     f_path = f.get_path(year, "output", "pnl.xlsx")
     df_avg.to_excel(f_path)
 
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import socketserver
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import finance.categorize as c
+import finance.dag as dag
+import finance.dataframe as d
+import finance.functions as f
+import finance.index as ix
+import finance.pipeline as pl
+import finance.report as r
+import finance.validate as v
+import finance.watch as w
+
+pd = f.lazy_import("pandas")
+
+
+def categorize_stage(year: int, artifacts: dict) -> pd.DataFrame:
+    # categories only, exports are written by the pipeline
+    return c.add_category(artifacts["parse"].copy(), artifacts["categories"])
+
+
+def summarize_stage(year: int, artifacts: dict) -> pd.DataFrame:
+    df, _ = r.summarize_months(year, artifacts["categorize"].copy(), artifacts["fx_rates"])
+    return df
+
+
+# in-memory stages of a session (parse is replaced by the watcher's
+# incremental parse, which only re-parses changed input files)
+STAGES = [
+    dag.Stage("fx_rates", pl.fx_rates_stage, files=[("settings", "fx_rates.json")]),
+    dag.Stage("categories", pl.categories_stage, files=[("output", "transactions.xlsx")]),
+    dag.Stage("parse", None, files=[("input", None)]),
+    dag.Stage("categorize", categorize_stage, upstream=["parse", "categories"]),
+    dag.Stage("summarize", summarize_stage, upstream=["categorize", "fx_rates"]),
+]
+
+
+class FinanceSession:
+    # parsed transactions, settings & aggregates of a year kept in memory;
+    # every query first checks the input files (mtimes) & re-runs the stages
+    # of changed files, aggregates are cached until then
+    def __init__(self, year: int, auto_refresh=True):
+        self.year = year
+        self.watcher = w.Watcher(year, STAGES)
+        self.auto_refresh = auto_refresh
+        self.cache = {}
+        self.refresh()
+
+    def refresh(self) -> set:
+        names = self.watcher.update()
+        if names:
+            self.cache = {}
+        return names
+
+    def check(self):
+        # once per query, so all artifacts of a query are from the same run
+        if self.auto_refresh:
+            self.refresh()
+
+    def get_artifact(self, name: str):
+        if name in self.watcher.dirty:
+            raise ValueError(f"Stage '{name}' failed, please fix the input files")
+        return self.watcher.artifacts[name]
+
+    def get_cached(self, key: str, function):
+        if key not in self.cache:
+            self.cache[key] = function()
+        return self.cache[key]
+
+    def get_transactions(self) -> pd.DataFrame:
+        self.check()
+        return self.get_artifact("summarize")
+
+    def get_category_totals(self, month=None) -> pd.DataFrame:
+        # USD totals per category (of the month if given)
+        self.check()
+        df_sum = self.get_cached("category_totals", lambda: r.summarize_categories(self.get_artifact("summarize")))
+        months = [col for col in df_sum.columns if col not in ["CategoryType", "CategoryName"]]
+        df_totals = df_sum[["CategoryType", "CategoryName"]].copy()
+        df_totals["AmountUSD"] = df_sum[months].sum(axis=1) if month is None else df_sum.get(month, 0)
+        return df_totals
+
+    def get_balance(self, account: str, currency: str, date=None) -> float:
+        # initial balance + transactions until the date (inclusive)
+        self.check()
+        df_index = self.get_cached(
+            "balance_index", lambda: d.IndexedFrame(self.get_artifact("categorize"), ["Account", "Currency"])
+        )
+        # cached while accounts.csv is unchanged
+        initial = v.get_initial_balance(self.year, account, currency)
+        pnl = v.get_pnl(df_index, {"Account": account, "Currency": currency}, date)
+        return float(initial + pnl)
+
+    def get_uncategorized(self) -> pd.DataFrame:
+        self.check()
+        return d.get_missing_values(self.get_artifact("categorize"), "CategoryName")
+
+    def search(self, text: str) -> pd.DataFrame:
+        # transactions whose details contain the text
+        self.check()
+        df = self.get_artifact("categorize")
+        token_index = self.get_cached("token_index", lambda: ix.TokenIndex(list(df["Details"])))
+        return df.iloc[token_index.search(text)]
+
+
+def to_json(value) -> bytes:
+    if isinstance(value, pd.DataFrame):
+        value = value.to_dict(orient="records")
+    return json.dumps(value, default=str).encode("utf-8")
+
+
+class SessionHandler(BaseHTTPRequestHandler):
+    # GET /categories?month=1, /balance?account=A&currency=USD&date=2023-01-31,
+    # /uncategorized, /search?text=coffee & /refresh, answered as json
+    session = None
+
+    def address_string(self) -> str:
+        # unix sockets have no client address
+        return self.client_address[0] if self.client_address else "local"
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = {key: values[0] for key, values in urllib.parse.parse_qs(url.query).items()}
+        try:
+            result = self.get_result(url.path, query)
+            status = 200 if result is not None else 404
+            body = to_json(result if result is not None else {"error": f"Unknown path '{url.path}'"})
+        except (KeyError, ValueError) as e:
+            status, body = 400, to_json({"error": str(e)})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_result(self, path: str, query: dict):
+        if path == "/categories":
+            month = int(query["month"]) if "month" in query else None
+            return self.session.get_category_totals(month)
+        if path == "/balance":
+            date = dt.date.fromisoformat(query["date"]) if "date" in query else None
+            return {"balance": self.session.get_balance(query["account"], query["currency"], date)}
+        if path == "/uncategorized":
+            return self.session.get_uncategorized()
+        if path == "/search":
+            return self.session.search(query["text"])
+        if path == "/refresh":
+            return {"stages": sorted(self.session.refresh())}
+        return None
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+
+def get_server(session: FinanceSession, address: str):
+    # "host:port" for local http, else the path of a unix socket
+    handler = type("Handler", (SessionHandler,), {"session": session})
+    if ":" in address:
+        host, port = address.rsplit(":", 1)
+        return HTTPServer((host or "127.0.0.1", int(port)), handler)
+    return UnixHTTPServer(address, handler)
+
+
+def serve(year: int, address: str):
+    session = FinanceSession(year)
+    server = get_server(session, address)
+    print(f"Serving data/{year} on {address} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stop serving")
+    finally:
+        server.server_close()
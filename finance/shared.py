@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import pickle
+
+import finance.functions as f
+
+np = f.lazy_import("numpy")
+pd = f.lazy_import("pandas")
+
+# column buffers start at multiples of 64 bytes (cache line)
+ALIGNMENT = 64
+INDEX = "__index__"
+
+
+def get_column_data(values) -> list:
+    # numeric, bool & datetime columns as they are, other columns (e.g. text,
+    # dates) as factorized codes & pickled unique values
+    if values.dtype.kind in "biufcmM":
+        return [("array", values)]
+    codes, uniques = pd.factorize(values.astype(object))
+    uniques = pickle.dumps(list(uniques), protocol=pickle.HIGHEST_PROTOCOL)
+    return [("codes", codes.astype(np.int32)), ("uniques", np.frombuffer(uniques, dtype=np.uint8))]
+
+
+class SharedFrame:
+    # columns of a frame in one shared memory block; the handle (block name &
+    # column layout) pickles to a few hundred bytes & processes attach to the
+    # block, numeric columns are used in place, object columns are decoded
+    # from codes & unique values
+    def __init__(self, name: str, layout: dict, n_rows: int, shm=None, owner=False):
+        from multiprocessing import shared_memory
+
+        self.name = name
+        # column -> [(part, dtype, offset, length)]
+        self.layout = layout
+        self.n_rows = n_rows
+        self.shm = shm or shared_memory.SharedMemory(name=name)
+        self.owner = owner
+
+    @classmethod
+    def publish(cls, df: pd.DataFrame) -> SharedFrame:
+        from multiprocessing import shared_memory
+
+        columns = {col: get_column_data(df[col].to_numpy()) for col in df.columns}
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+            columns[INDEX] = get_column_data(df.index.to_numpy())
+        layout, size = {}, 0
+        for col, parts in columns.items():
+            layout[col] = []
+            for part, values in parts:
+                layout[col].append((part, values.dtype.str, size, len(values)))
+                size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        frame = cls(shm.name, layout, len(df.index), shm, owner=True)
+        for col, parts in columns.items():
+            for (_, values), (_, dtype, offset, length) in zip(parts, layout[col]):
+                frame.get_buffer(dtype, offset, length)[:] = values
+        return frame
+
+    def __reduce__(self):
+        # only the handle is pickled, the receiving process attaches
+        return SharedFrame, (self.name, self.layout, self.n_rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def columns(self) -> list:
+        return [col for col in self.layout if col != INDEX]
+
+    def get_buffer(self, dtype: str, offset: int, length: int):
+        return np.ndarray((length,), dtype=np.dtype(dtype), buffer=self.shm.buf, offset=offset)
+
+    def get_values(self, col: str):
+        parts = {part: self.get_buffer(*spec) for part, *spec in self.layout[col]}
+        if "array" in parts:
+            # other processes see writes to the block
+            parts["array"].flags.writeable = False
+            return parts["array"]
+        # code -1 (missing) picks the trailing None
+        uniques = pickle.loads(parts["uniques"].tobytes())
+        values = np.empty(len(uniques) + 1, dtype=object)
+        values[:-1] = uniques
+        return values[parts["codes"]]
+
+    def to_frame(self, columns=None) -> pd.DataFrame:
+        # numeric columns are read-only views of the block: the block must
+        # stay open while the frame is used (copy the frame to keep it)
+        columns = self.columns if columns is None else columns
+        index = self.get_values(INDEX) if INDEX in self.layout else None
+        data = {col: self.get_values(col) for col in columns}
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def close(self):
+        # the publishing process also frees the block
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import os
+
+import finance.functions as f
+
+pd = f.lazy_import("pandas")
+
+# rows converted & written per step of a streaming excel export
+CHUNK_SIZE = 10000
+
+
+def get_store_path(year: int, name="transactions") -> str:
+    return f.get_path(year, "output", f"{name}.arrow")
+
+
+def to_table(df: pd.DataFrame):
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # mixed object columns (e.g. numbers typed into Comment) are stored as text
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].isnull(), df[col].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def save_frame(df: pd.DataFrame, f_path: str):
+    import pyarrow as pa
+
+    table = to_table(df)
+    # uncompressed IPC file, so readers can map it without decoding;
+    # written next to the target & renamed, so readers never see a partial file
+    tmp_path = f"{f_path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, f_path)
+
+
+def load_table(f_path: str, columns=None):
+    import pyarrow as pa
+
+    # buffers point into the memory map (shared page cache between processes)
+    # and keep it open, nothing is parsed or copied
+    table = pa.ipc.open_file(pa.memory_map(f_path, "r")).read_all()
+    return table if columns is None else table.select(columns)
+
+
+def load_frame(f_path: str, columns=None) -> pd.DataFrame:
+    return load_table(f_path, columns).to_pandas()
+
+
+def save_excel(
+    df: pd.DataFrame,
+    f_path: str,
+    sheet_name="Sheet1",
+    chunk_size=CHUNK_SIZE,
+    column_widths=None,
+    auto_filter=False,
+):
+    # write-only workbook: rows are streamed to disk chunk by chunk instead
+    # of building every cell of the workbook in memory (same values as to_excel)
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+    from openpyxl.utils import get_column_letter
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    for col, width in (column_widths or {}).items():
+        if col in df.columns:
+            ws.column_dimensions[get_column_letter(df.columns.get_loc(col) + 1)].width = width
+    if auto_filter and len(df.columns) > 0:
+        ws.auto_filter.ref = f"A1:{get_column_letter(len(df.columns))}{len(df.index) + 1}"
+
+    # header styled like pandas
+    side = Side(style="thin")
+    header = []
+    for col in df.columns:
+        cell = WriteOnlyCell(ws, value=str(col))
+        cell.font = Font(bold=True)
+        cell.border = Border(left=side, right=side, top=side, bottom=side)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        header.append(cell)
+    ws.append(header)
+
+    for start in range(0, len(df.index), chunk_size):
+        df_chunk = df.iloc[start:start + chunk_size].astype(object)
+        df_chunk = df_chunk.where(df_chunk.notnull(), None)
+        for row in df_chunk.itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(f_path)
+
+
+def save_side_outputs(df: pd.DataFrame, f_path: str, formats: list) -> list:
+    # copies of an export next to it, e.g. transactions.csv / .parquet
+    f_paths = []
+    for file_format in formats:
+        side_path = f"{os.path.splitext(f_path)[0]}.{file_format}"
+        if file_format == "csv":
+            df.to_csv(side_path, index=False, chunksize=CHUNK_SIZE)
+        elif file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(to_table(df), side_path)
+        else:
+            raise ValueError(f"Invalid output format '{file_format}'")
+        f_paths.append(side_path)
+    return f_paths
+
+
+def save_transactions(df: pd.DataFrame, year: int) -> str:
+    f_path = get_store_path(year)
+    save_frame(df, f_path)
+    return f_path
+
+
+def load_transactions(year: int, columns=None) -> pd.DataFrame:
+    return load_frame(get_store_path(year), columns)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import html
+import math
+import os.path
+import sys
+
+# tables are collected but never formatted unless something is written
+QUIET = False
+# tables are also appended to this file (.md / .html / text otherwise)
+REPORT_PATH = None
+
+FORMATS = {".md": "markdown", ".html": "html"}
+
+
+def is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def format_column(values: list, spec: str) -> list:
+    # one bound format per column, missing values are blank
+    if spec == "":
+        return ["" if value is None else str(value) for value in values]
+    cell_format = ("{:" + spec + "}").format
+    return ["" if is_missing(value) else cell_format(value) for value in values]
+
+
+class Table:
+    # console / file report: rows are collected column by column & rendered
+    # as one buffered table
+    def __init__(self, title: str, columns: list, formats=None):
+        self.title = title
+        self.columns = columns
+        # column -> format spec, e.g. {"Amount": ".2f"}
+        self.formats = formats or {}
+        self.values = {col: [] for col in columns}
+
+    def __len__(self) -> int:
+        return len(self.values[self.columns[0]]) if self.columns else 0
+
+    def add(self, *row):
+        for col, value in zip(self.columns, row):
+            self.values[col].append(value)
+
+    def extend(self, columns: dict):
+        # whole columns at once (lists or arrays of the same length)
+        for col in self.columns:
+            self.values[col].extend(columns[col])
+
+    def get_cells(self) -> list:
+        return [format_column(self.values[col], self.formats.get(col, "")) for col in self.columns]
+
+    def render(self, output_format="text") -> str:
+        cells = self.get_cells()
+        if output_format == "html":
+            header = "".join(f"<th>{html.escape(str(col))}</th>" for col in self.columns)
+            rows = "".join(
+                "<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>\n"
+                for row in zip(*cells)
+            )
+            return f"<h3>{html.escape(self.title)}</h3>\n<table>\n<tr>{header}</tr>\n{rows}</table>\n"
+        if output_format == "markdown":
+            lines = [f"### {self.title}", "", "| " + " | ".join(map(str, self.columns)) + " |"]
+            lines.append("|" + "|".join("---:" if col in self.formats else "---" for col in self.columns) + "|")
+            lines += ["| " + " | ".join(cell.replace("|", "\\|") for cell in row) + " |" for row in zip(*cells)]
+            return "\n".join(lines) + "\n"
+        if output_format != "text":
+            raise ValueError(f"Invalid output format '{output_format}'")
+        # numbers right, text left aligned: one format call per row
+        columns = [[str(col)] + column_cells for col, column_cells in zip(self.columns, cells)]
+        specs = [
+            ("{:>%d}" if col in self.formats else "{:<%d}") % max(map(len, column_cells))
+            for col, column_cells in zip(self.columns, columns)
+        ]
+        row_format = "  ".join(specs).format
+        lines = [f"{self.title}:"] + [row_format(*row).rstrip() for row in zip(*columns)]
+        return "\n".join(lines) + "\n"
+
+    def show(self, quiet=None, report_path=None):
+        # print to the console (unless quiet) & append to the report file
+        quiet = QUIET if quiet is None else quiet
+        report_path = REPORT_PATH if report_path is None else report_path
+        if not quiet:
+            sys.stdout.write(self.render())
+            sys.stdout.flush()
+        if report_path is not None:
+            output_format = FORMATS.get(os.path.splitext(report_path)[1], "text")
+            with open(report_path, "a", encoding="utf-8") as file:
+                file.write(self.render(output_format) + "\n")
@@ -1,14 +1,21 @@
 #!/usr/bin/env python
+from __future__ import annotations
 
+import csv
 import datetime as dt
+import os.path
+from typing import Union
 
-import pandas as pd
-
+import finance.cache as cache
 import finance.dataframe as d
 import finance.functions as f
+import finance.table as tb
+
+pd = f.lazy_import("pandas")
 
 COLS_BALANCE = ["Account", "Balance", "Currency", "Date", "Adjustment"]
 COLS_ACCOUNT = ["Account", "Currency", "InitialBalance"]
+COLS_CATEGORY_GROUP = ["Grouping", "Prefix", "Group"]
 
 
 def get_balances(year: int):
@@ -23,41 +30,56 @@ def get_balances(year: int):
 
 def check_monthly_balances(df: pd.DataFrame, year: int):
     df_balances = get_balances(year)
+    df_index = d.IndexedFrame(df, ["Account", "Currency"])
+    table = tb.Table(
+        "Check monthly balances",
+        ["Date", "Account", "Currency", "Initial", "PnL", "Reported", "Adjustment"],
+        {col: ".2f" for col in ["Initial", "PnL", "Reported", "Adjustment"]},
+    )
 
-    # compare balances
-    print("Check monthly balances:")
-    for index, row in df_balances.iterrows():
-        account = row["Account"]
-        currency = row["Currency"]
-        balance_date = row["Date"]
-        balance_reported = row["Balance"]
-        adjustment = row["Adjustment"]
-
-        print(f"-- {balance_date}: {account}")
-        balance_initial = get_initial_balance(year, account, currency)
-        should_have_pnl = balance_initial != (adjustment + balance_reported)
-        account_pnl = get_pnl(
-            df,
-            {"Account": account, "Currency": currency},
-            balance_date,
-            raise_error=should_have_pnl,
-        )
-        compare_balances(
-            balance_initial,
-            account_pnl,
-            balance_reported,
-            adjustment,
-            account,
-            currency,
-            balance_date,
-        )
+    # compare balances (the checked rows are shown at once, also on a mismatch)
+    try:
+        for account, currency, balance_date, balance_reported, adjustment in zip(
+            df_balances["Account"],
+            df_balances["Currency"],
+            df_balances["Date"],
+            df_balances["Balance"],
+            df_balances["Adjustment"],
+        ):
+            balance_initial = get_initial_balance(year, account, currency)
+            should_have_pnl = balance_initial != (adjustment + balance_reported)
+            account_pnl = get_pnl(
+                df_index,
+                {"Account": account, "Currency": currency},
+                balance_date,
+                raise_error=should_have_pnl,
+            )
+            table.add(str(balance_date), account, currency, balance_initial, account_pnl, balance_reported, adjustment)
+            compare_balances(
+                balance_initial,
+                account_pnl,
+                balance_reported,
+                adjustment,
+                account,
+                currency,
+                balance_date,
+            )
+    finally:
+        table.show()
 
     print("All balances are checked! :)")
 
 
-def get_initial_balance(year: int, account: str, currency: str) -> float:
+@cache.file_cache(lambda year: [f.get_path(year, "settings", "accounts.csv")])
+def get_accounts(year: int) -> pd.DataFrame:
     df = d.parse_csv(year, "settings", "accounts.csv")
     d.has_columns(df, COLS_ACCOUNT, raise_error=True)
+    return df
+
+
+@cache.file_cache(lambda year, account, currency: [f.get_path(year, "settings", "accounts.csv")])
+def get_initial_balance(year: int, account: str, currency: str) -> float:
+    df = get_accounts(year)
     df_filter = d.filter_values(
         df, {"Account": account, "Currency": currency}, raise_error=True
     )
@@ -70,17 +92,17 @@ def get_initial_balance(year: int, account: str, currency: str) -> float:
 
 
 def get_pnl(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, d.IndexedFrame],
     filter_dict: dict,
     cutoff_date=None,
     raise_error=False,
 ) -> float:
-    d.has_column(df, "Amount", raise_error=True)
-    df_pnl = d.filter_values(df, filter_dict, raise_error)
-    if cutoff_date:
-        d.has_column(df, "Date", raise_error=True)
-        df_pnl = d.filter_date(df_pnl, cutoff_date)
-    return df_pnl["Amount"].sum()
+    df_index = (
+        df
+        if isinstance(df, d.IndexedFrame)
+        else d.IndexedFrame(df, list(filter_dict))
+    )
+    return df_index.sum(filter_dict, cutoff_date, raise_error)
 
 
 def compare_balances(
@@ -124,7 +146,47 @@ def convert_amount(
         return round(amount * get_fx_rate(ccy_from) / get_fx_rate(ccy_to), 2)
 
 
+@cache.file_cache(lambda year: [f.get_path(year, "settings", "fx_rates.json")])
 def get_fx_rates(year: int):
     f_path = f.get_path(year, "settings", "fx_rates.json")
     fx_rates = f.read_json(f_path)
     return fx_rates
+
+
+def read_settings_csv(year: int, file_name: str, columns: list) -> list:
+    # plain csv reader so settings can be checked without importing pandas
+    f_path = f.get_path(year, "settings", file_name)
+    with open(f_path, "r", encoding="utf-8", newline="") as file:
+        reader = csv.DictReader(file)
+        header = [col.strip() for col in reader.fieldnames or []]
+        rows = [{k.strip(): (v or "").strip() for k, v in row.items() if k is not None} for row in reader]
+    for col in columns:
+        if col not in header:
+            raise ValueError(f"Column '{col}' not found!")
+    return rows
+
+
+def check_settings(year: int):
+    accounts = read_settings_csv(year, "accounts.csv", COLS_ACCOUNT)
+    balances = read_settings_csv(year, "balances.csv", COLS_BALANCE)
+    fx_rates = get_fx_rates(year)
+    for file_name, rows, columns in [
+        ("accounts.csv", accounts, COLS_ACCOUNT),
+        ("balances.csv", balances, [col for col in COLS_BALANCE if col != "Adjustment"]),
+    ]:
+        for row in rows:
+            for col in columns:
+                if row[col] == "":
+                    raise ValueError(f"Missing values found in column '{col}' of '{file_name}'!")
+            if row["Currency"] not in fx_rates:
+                raise ValueError(f"No FX rate found for '{row['Currency']}'")
+    account_names = {(row["Account"], row["Currency"]) for row in accounts}
+    for row in balances:
+        if (row["Account"], row["Currency"]) not in account_names:
+            raise ValueError(f"Account '{row['Account']}' ({row['Currency']}) not found in 'accounts.csv'!")
+        dt.date.fromisoformat(row["Date"])
+    # optional P&L groupings of the categories
+    if os.path.isfile(f.get_path(year, "settings", "category_groups.csv")):
+        for row in read_settings_csv(year, "category_groups.csv", COLS_CATEGORY_GROUP):
+            if row["Grouping"] == "":
+                raise ValueError("Missing values found in column 'Grouping' of 'category_groups.csv'!")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import os
+import os.path
+import time
+
+import finance.dag as dag
+import finance.functions as f
+import finance.parser as p
+import finance.pipeline as pl
+
+pd = f.lazy_import("pandas")
+
+INTERVAL = 1.0
+
+
+def get_watched_files(year: int, stages: dict) -> dict:
+    # file path -> stages reading it
+    watched = {}
+    for name, stage in stages.items():
+        # new or deleted files change the folder listing
+        folder_paths = [f.get_path(year, folder) for folder, file_name in stage.files if file_name is None]
+        for f_path in folder_paths + stage.get_file_paths(year):
+            watched.setdefault(f_path, set()).add(name)
+    return watched
+
+
+def get_mtime(f_path: str):
+    return os.stat(f_path).st_mtime_ns if os.path.exists(f_path) else None
+
+
+class Watcher:
+    def __init__(self, year: int, stages=None, interval=INTERVAL):
+        self.year = year
+        self.stages = {stage.name: stage for stage in stages or pl.STAGES}
+        parse = self.stages["parse"]
+        self.stages["parse"] = dag.Stage("parse", self.parse_stage, parse.files, parse.upstream, parse.outputs)
+        self.interval = interval
+        self.artifacts = {}
+        self.parsed_files = {}
+        # stages that never ran & failed stages (retried once an input changes)
+        self.pending = set(self.stages)
+        self.dirty = set(self.stages)
+        self.mtimes = {}
+
+    def parse_stage(self, year: int, artifacts: dict) -> pd.DataFrame:
+        # only re-parse input files that changed since the last run
+        dfs = []
+        file_names = []
+        print("Parse transactions:")
+        for transaction_file in f.get_transaction_files(year):
+            if transaction_file.startswith(".~lock"):
+                continue
+            mtime = get_mtime(f.get_path(year, "input", transaction_file))
+            cached = self.parsed_files.get(transaction_file)
+            if cached is None or cached[0] != mtime:
+                print(f"-- {transaction_file}")
+                cached = (mtime, p.parse_transaction_file(year, transaction_file))
+                self.parsed_files[transaction_file] = cached
+            dfs.append(cached[1])
+            file_names.append(transaction_file)
+        df, _ = p.drop_duplicate_transactions(dfs, file_names)
+        return df
+
+    def snapshot(self) -> dict:
+        watched = get_watched_files(self.year, self.stages)
+        return {f_path: (get_mtime(f_path), names) for f_path, names in watched.items()}
+
+    def get_changed_stages(self, mtimes: dict) -> set:
+        changed = set()
+        for f_path in set(mtimes) | set(self.mtimes):
+            old_mtime, old_names = self.mtimes.get(f_path, (None, set()))
+            new_mtime, new_names = mtimes.get(f_path, (None, set()))
+            if old_mtime != new_mtime:
+                changed |= old_names | new_names
+        return changed
+
+    def run_stages(self, names: set) -> dict:
+        # returns the output files written by the stages & their mtimes
+        failed = {name for name in self.dirty if name not in names}
+        written = {}
+        for name in dag.get_stage_order(self.stages):
+            stage = self.stages[name]
+            if name not in names:
+                continue
+            if any(upstream in failed for upstream in stage.upstream):
+                failed.add(name)
+                continue
+            f_paths = [f.get_path(self.year, folder, file_name) for folder, file_name in stage.outputs]
+            old_mtimes = [get_mtime(f_path) for f_path in f_paths]
+            try:
+                artifacts = {upstream: self.artifacts[upstream] for upstream in stage.upstream}
+                self.artifacts[name] = stage.function(self.year, artifacts)
+            except Exception as e:
+                # e.g. invalid settings or a partially copied input file: keep
+                # the failed stage & its downstream stages until an input changes
+                print(f"Stage '{name}' failed: {type(e).__name__}: {e}")
+                failed.add(name)
+            finally:
+                # right after writing, so later edits (e.g. of transactions.xlsx)
+                # are still changes
+                for f_path, old_mtime in zip(f_paths, old_mtimes):
+                    mtime = get_mtime(f_path)
+                    if mtime != old_mtime:
+                        written[f_path] = mtime
+        self.dirty = failed
+        return written
+
+    def update(self) -> set:
+        mtimes = self.snapshot()
+        changed = self.get_changed_stages(mtimes)
+        names = dag.get_downstream_stages(self.stages, changed | self.pending)
+        self.pending = set()
+        if names:
+            order = [name for name in dag.get_stage_order(self.stages) if name in names]
+            print(f"Run stages: {', '.join(order)}")
+            # output files written by the stages themselves are not changes
+            for f_path, mtime in self.run_stages(names).items():
+                if f_path in mtimes:
+                    mtimes[f_path] = (mtime, mtimes[f_path][1])
+        self.mtimes = mtimes
+        return names
+
+    def run(self):
+        print(f"Watching data/{self.year} (Ctrl+C to stop)")
+        try:
+            while True:
+                self.update()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print("Stop watching")
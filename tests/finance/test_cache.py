@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+import os
+
+import pandas as pd
+
+import finance.cache as cache
+
+
+def test_file_cache(tmp_path):
+    calls = []
+
+    @cache.file_cache(lambda name: [tmp_path / name], maxsize=2)
+    def read(name: str) -> dict:
+        calls.append(name)
+        return {"text": (tmp_path / name).read_text()}
+
+    for name in ["a", "b", "c"]:
+        (tmp_path / name).write_text(name)
+    # it should only call the function once for the same arguments & files
+    assert read("a") == {"text": "a"}
+    assert read("a") == {"text": "a"}
+    assert calls == ["a"]
+    # it should return copies of the cached dicts & lists
+    read("a")["text"] = "changed"
+    assert read("a") == {"text": "a"}
+    # it should call the function again once the file changed
+    (tmp_path / "a").write_text("new a")
+    os.utime(tmp_path / "a", ns=(1, 1))
+    assert read("a") == {"text": "new a"}
+    assert calls == ["a", "a"]
+    # it should evict the least recently used entry
+    read("b")
+    read("c")
+    read("b")
+    read("a")
+    assert calls == ["a", "a", "b", "c", "a"]
+    assert read.cache_info() == {
+        "Function": "tests.finance.test_cache.test_file_cache.<locals>.read",
+        "Hits": 4,
+        "Misses": 5,
+        "Evictions": 2,
+        "Size": 2,
+        "MaxSize": 2,
+    }
+    # it should not cache results of missing files
+    (tmp_path / "c").unlink()
+    calls.clear()
+    for _ in range(2):
+        try:
+            read("c")
+        except FileNotFoundError:
+            pass
+    assert calls == ["c", "c"]
+    # it should reset the counters
+    read.cache_clear()
+    assert read.cache_info()["Misses"] == 0
+    cache.CACHES.remove(read)
+
+
+def test_file_cache_working_directory(tmp_path, monkeypatch):
+    @cache.file_cache(lambda name: [name])
+    def read(name: str) -> pd.DataFrame:
+        return pd.read_csv(name)
+
+    for tree, rate in [("a", 1.5), ("b", 2.5)]:
+        os.makedirs(tmp_path / tree)
+        (tmp_path / tree / "rates.csv").write_text(f"Rate\n{rate}\n")
+        os.utime(tmp_path / tree / "rates.csv", ns=(1, 1))
+    # it should not return results of a file with the same relative path,
+    # mtime & size in another directory
+    monkeypatch.chdir(tmp_path / "a")
+    assert read("rates.csv").loc[0, "Rate"] == 1.5
+    monkeypatch.chdir(tmp_path / "b")
+    assert read("rates.csv").loc[0, "Rate"] == 2.5
+    # it should return copies of cached frames
+    read("rates.csv").loc[0, "Rate"] = 0
+    assert read("rates.csv").loc[0, "Rate"] == 2.5
+    assert read.cache_info()["Hits"] == 2
+    cache.CACHES.remove(read)
@@ -64,3 +64,91 @@ def test_add_category(tmp_path, mocker):
     with pytest.raises(ValueError) as context_info:
         c.add_category(df_mlt, DF_CAT)
     assert "Multiple categories found" in str(context_info.value)
+
+
+def test_add_category_pattern_type():
+    df_cat = pd.DataFrame(
+        data={
+            "CategoryName": ["Transport", "Groceries"],
+            "Pattern": ["^Uber", "Market"],
+            "PatternType": ["Regex", "Word"],
+            "Priority": [1, 1],
+        }
+    )
+    df = pd.DataFrame(data={"Details": ["Uber Eats", "Market", "Supermarket"]})
+    # it should add category based on regex and word patterns
+    df_actual = c.add_category(df, df_cat)
+    assert list(df_actual["CategoryName"]) == ["Transport", "Groceries", ""]
+    assert list(df_actual["PatternType"]) == ["Regex", "Word", ""]
+
+
+def test_compact_categories():
+    df_cat = pd.DataFrame(
+        data={
+            "Priority": [1, 1, 1, 2, 1, 1, 1],
+            "CategoryName": ["Food", "Food", "Food", "Food", "Shop", "Shop", "Shop"],
+            "Pattern": [
+                "Walmart",
+                "Walmart Supercenter",
+                "2023-01-28 Food from Walmart",
+                "Walmart Grocery",
+                "Amazon",
+                "2023-03-02 Amazon Prime",
+                "2023-03-02 Amazon",
+            ],
+            "PatternType": ["Literal"] * 7,
+        }
+    )
+    df_compact = c.compact_categories(pd.concat([df_cat, df_cat.head(1)]))
+    # it should remove duplicates and patterns implied by shorter patterns
+    assert list(df_compact["Pattern"]) == ["Walmart", "Walmart Grocery", "Amazon"]
+    # it should only drop patterns of the same category, also for short ones
+    df_short = df_cat.assign(Pattern=["Wa", "Wal", "Walmart", "Walmart Grocery", "Wa", "Amazon", "Amazon Prime"])
+    df_compact = c.compact_categories(df_short)
+    assert list(df_compact["Pattern"]) == ["Wa", "Walmart Grocery", "Wa", "Amazon"]
+    # it should keep the pattern types
+    df_shop = df_cat[df_cat["CategoryName"] == "Shop"].iloc[1:].copy()
+    df_shop["Priority"] = [1, 2]
+    df_compact = c.compact_categories(df_shop)
+    assert list(df_compact["PatternType"]) == ["Literal", "Literal"]
+    # it should keep matching the same transactions, also new ones
+    details = ["2023-03-02 Amazon Prime", "2023-03-02 Amazon", "2023-03-02 Amazon Music"]
+    df = pd.DataFrame(data={"Details": details})
+    df_expected = c.add_category(df.copy(), df_shop)
+    df_actual = c.add_category(df.copy(), df_compact)
+    assert list(df_actual["Priority"]) == list(df_expected["Priority"]) == [2, 2, 2]
+
+
+def test_preview_category_changes():
+    df = pd.DataFrame(data={"Details": ["Coffee Shop", "Rent", "Coffee", "Pizza"]})
+    df_cat = pd.DataFrame(
+        data={
+            "Pattern": ["Coffee", "Rent"],
+            "PatternType": ["Literal", "Literal"],
+            "Priority": [1, 1],
+            "CategoryName": ["Cafe", "Home"],
+        }
+    )
+    match_index = c.get_match_index(df, df_cat)
+    # it should return no changes for the same categories
+    assert c.preview_category_changes(match_index, df_cat).empty
+    # it should return transactions of added, removed & modified patterns
+    df_cat_new = pd.DataFrame(
+        data={
+            "Pattern": ["Coffee", "Shop", "Pizza"],
+            "PatternType": ["Literal", "Word", "Literal"],
+            "Priority": [1, 2, 1],
+            "CategoryName": ["Cafe", "Shopping", "Food"],
+        }
+    )
+    df_diff = c.preview_category_changes(match_index, df_cat_new)
+    assert list(df_diff["Row"]) == [0, 1, 3]
+    assert list(df_diff["OldCategory"]) == ["Cafe", "Home", ""]
+    assert list(df_diff["NewCategory"]) == ["Shopping", "", "Food"]
+    assert list(df_diff["NewPattern"]) == ["Shop", None, "Pizza"]
+    # it should flag new conflicts
+    df_cat_conflict = df_cat.assign(Priority=[1, 1])
+    df_cat_conflict.loc[2] = ["Shop", "Literal", 1, "Shopping"]
+    df_diff = c.preview_category_changes(match_index, df_cat_conflict)
+    assert list(df_diff["Row"]) == [0]
+    assert df_diff.loc[0, "Conflict"]
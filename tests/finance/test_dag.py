@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+import os
+
+import pytest
+
+import finance.dag as dag
+
+
+def get_stages(calls: list) -> list:
+    def stage(name: str):
+        def run(year, artifacts):
+            calls.append(name)
+            if name == "report":
+                return sum(artifacts.values())
+            return len(calls)
+
+        return run
+
+    return [
+        dag.Stage("report", stage("report"), upstream=["read", "settings"], outputs=[("output", "report.txt")]),
+        dag.Stage("read", stage("read"), files=[("input", None)]),
+        dag.Stage("settings", stage("settings"), files=[("settings", "fx.json")]),
+    ]
+
+
+def test_get_stage_order():
+    stages = {stage.name: stage for stage in get_stages([])}
+    # it should put upstream stages first
+    assert dag.get_stage_order(stages)[-1] == "report"
+    # it should find downstream stages
+    assert dag.get_downstream_stages(stages, {"settings"}) == {"settings", "report"}
+    # it should throw error for unknown stages
+    stages["read"].upstream = ["unknown"]
+    with pytest.raises(ValueError) as context_info:
+        dag.get_stage_order(stages)
+    assert "Unknown upstream stage 'unknown'" in str(context_info.value)
+    # it should throw error for cycles
+    stages["read"].upstream = ["report"]
+    with pytest.raises(ValueError) as context_info:
+        dag.get_stage_order(stages)
+    assert "Stage cycle found" in str(context_info.value)
+
+
+def test_dag_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for folder in ["input", "settings", "output"]:
+        os.makedirs(tmp_path / "data" / "2020" / folder)
+    fx_path = tmp_path / "data" / "2020" / "settings" / "fx.json"
+    fx_path.write_text("{}")
+    (tmp_path / "data" / "2020" / "output" / "report.txt").write_text("")
+    calls = []
+    # it should run every stage first
+    status = dag.DAG(2020, get_stages(calls)).run()
+    assert status == {"read": "run", "settings": "run", "report": "run"}
+    assert calls[-1] == "report"
+    # it should skip unchanged stages in a new process
+    calls.clear()
+    status = dag.DAG(2020, get_stages(calls)).run()
+    assert calls == []
+    assert set(status.values()) == {"skip"}
+    # it should run changed stages & stages with changed inputs
+    os.utime(fx_path, ns=(0, 0))
+    dag_changed = dag.DAG(2020, get_stages(calls))
+    status = dag_changed.run()
+    assert status == {"read": "skip", "settings": "run", "report": "run"}
+    assert dag_changed.get_artifact("report") == 1 + dag_changed.get_artifact("read")
+    # it should run every stage if forced
+    calls.clear()
+    dag.DAG(2020, get_stages(calls)).run(force=True)
+    assert sorted(calls) == ["read", "report", "settings"]
@@ -241,3 +241,77 @@ def test_filter_date():
     df_date = pd.DataFrame(data={"Date": [dt.date(2013, 1, 20)]})
     assert d.filter_date(df_date, dt.date(2013, 1, 19)).empty
     assert d.filter_date(df_date, dt.date(2013, 1, 20)).equals(df_date)
+
+
+def test_indexed_frame():
+    df = pd.DataFrame(
+        data={
+            "Account": ["Bank", "Cash", "Bank", "Bank"],
+            "Currency": ["USD", "EUR", "USD", "EUR"],
+            "Amount": [10, 5, -3, 7],
+            "Date": [
+                dt.date(2013, 2, 1),
+                dt.date(2013, 1, 1),
+                dt.date(2013, 1, 15),
+                dt.date(2013, 3, 1),
+            ],
+        }
+    )
+    # it should throw error if column is missing
+    with pytest.raises(ValueError) as context_info:
+        d.IndexedFrame(df, ["Unknown"])
+    assert "Column 'Unknown' not found" in str(context_info.value)
+    # it should sum values per key group
+    df_index = d.IndexedFrame(df, ["Account", "Currency"])
+    assert df_index.sum({"Account": "Bank", "Currency": "USD"}) == 7
+    assert df_index.sum({"Account": "Bank", "Currency": "EUR"}) == 7
+    assert df_index.sum({"Account": "Cash", "Currency": "USD"}) == 0
+    # it should sum values until cutoff date
+    bank_usd = {"Account": "Bank", "Currency": "USD"}
+    assert df_index.sum(bank_usd, dt.date(2013, 1, 1)) == 0
+    assert df_index.sum(bank_usd, dt.date(2013, 1, 15)) == -3
+    assert df_index.sum(bank_usd, dt.date(2013, 2, 1)) == 7
+    # it should throw error if value not found and error flag is on
+    with pytest.raises(ValueError) as context_info:
+        df_index.sum({"Account": "Cash", "Currency": "USD"}, raise_error=True)
+    assert "No 'USD' found in column 'Currency'" in str(context_info.value)
+    # it should throw error if filter doesn't match index columns
+    with pytest.raises(ValueError) as context_info:
+        df_index.sum({"Account": "Cash"})
+    assert "Index columns are" in str(context_info.value)
+    # it should sum amounts of object dtype
+    df_object = df.astype({"Amount": object})
+    df_index = d.IndexedFrame(df_object, ["Account", "Currency"])
+    assert df_index.sum(bank_usd, dt.date(2013, 1, 15)) == -3
+    assert df_index.sum({"Account": "Bank", "Currency": "EUR"}) == 7
+
+
+def test_get_violations():
+    cols = ["Date", "Amount", "Details"]
+    df = pd.DataFrame(
+        {
+            "Date": ["2020-01-01", "2019-12-31", None, "2021-01-01", "2019-05-01"],
+            "Amount": [1, np.nan, 3, 4, 5],
+            "Details": ["a", "b", "", "d", "e"],
+        },
+        index=[10, 11, 12, 13, 14],
+    )
+    # it should return an empty report for valid data
+    assert d.get_violations(df.loc[[10]], cols, year=2020).empty
+    # it should report every violation with its rows
+    df_violations = d.get_violations(df, cols, year=2020)
+    assert list(df_violations["Check"]) == ["missing", "missing", "missing", "year", "year"]
+    assert list(df_violations["Column"]) == ["Date", "Amount", "Details", "Date", "Date"]
+    assert list(df_violations["Rows"]) == [[12], [11], [12], [11, 14], [13]]
+    assert df_violations.loc[3, "Message"] == "Invalid year 2019 found in data!"
+    # it should report schema violations before missing values
+    df_violations = d.get_violations(df[["Amount"]].assign(Extra=1), cols)
+    assert list(df_violations["Message"][:4]) == [
+        "Column 'Date' not found!",
+        "Column 'Details' not found!",
+        "Extra columns found in dataframe!",
+        "Missing values in 'Amount'",
+    ]
+    # it should report empty frames
+    df_violations = d.get_violations(pd.DataFrame(columns=cols), cols, year=2020)
+    assert list(df_violations["Message"]) == ["Empty dataframe!"]
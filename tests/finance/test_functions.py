@@ -59,3 +59,12 @@ def test_read_json(tmp_path):
     f_path = tmp_path / "test.json"
     f_path.write_text(json.dumps(data))
     assert f.read_json(f_path) == data
+
+
+def test_lazy_import():
+    module = f.lazy_import("json")
+    # it should not import the module before first use
+    assert module.module is None
+    # it should forward attribute access to the module
+    assert module.dumps({"a": 1}) == json.dumps({"a": 1})
+    assert module.module is json
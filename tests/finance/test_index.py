@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+import finance.index as ix
+import finance.matcher as m
+
+DETAILS = ["2023-01-02 Coffee Shop", "2023-01-03 Rent", None, "Coffee beans", "Shop"]
+
+
+def test_get_ngrams():
+    # it should return every n-gram of the text
+    assert ix.get_ngrams("Shop") == {"Sho", "hop"}
+    # it should return no n-grams for short texts
+    assert ix.get_ngrams("ab") == set()
+
+
+def test_token_index():
+    index = ix.TokenIndex(DETAILS)
+    assert index.n_rows == 5
+    # it should return rows containing all n-grams of the text
+    assert list(index.get_candidates("Coffee")) == [0, 3]
+    assert list(index.get_candidates("Shop")) == [0, 4]
+    assert list(index.get_candidates("Pizza")) == []
+    # it should return None if the text is too short to filter
+    assert index.get_candidates("ab") is None
+    # it should not filter regex patterns
+    assert index.get_pattern_candidates("Sh.p", "Regex") is None
+    assert list(index.get_pattern_candidates("Rent", "Word")) == [1]
+    # it should add rows after the existing ones
+    index.add(["More Coffee"])
+    assert list(index.get_candidates("Coffee")) == [0, 3, 5]
+
+
+def test_token_index_search():
+    index = ix.TokenIndex(DETAILS)
+    # it should return the rows containing the text
+    assert list(index.search("Coffee")) == [0, 3]
+    assert list(index.search("Coffee S")) == [0]
+    assert list(index.search("op")) == [0, 4]
+    # it should return the rows containing the word (case-insensitive)
+    assert list(index.search_token("shop")) == [0, 4]
+    assert list(index.search_token("Coff")) == []
+
+
+def test_token_index_update(tmp_path):
+    index = ix.TokenIndex(DETAILS)
+    # it should only index texts not indexed before
+    index.update(["Shop", "Rent"] + DETAILS)
+    assert len(index.texts) == 5
+    assert list(index.search("Shop")) == [0, 2, 6]
+    # it should load the saved index
+    f_path = str(tmp_path / "index.npz")
+    index.save(f_path)
+    loaded = ix.TokenIndex.load(f_path)
+    assert loaded.texts == index.texts
+    assert list(loaded.search("Shop")) == [0, 2, 6]
+    assert list(loaded.search_token("rent")) == [1, 3]
+
+
+def test_token_index_match(mocker):
+    patterns = ["Coffee", "Shop", "^Coffee", "2023-01-03", "ab", "Coffee beans"]
+    pattern_types = ["Literal", "Word", "Regex", "Literal", "Literal", "Literal"]
+    matcher = m.PatternMatcher(patterns, pattern_types)
+    # it should match like the pattern matcher
+    assert ix.TokenIndex(DETAILS).match(matcher) == matcher.match(DETAILS)
+    # it should scan many texts in worker processes
+    mocker.patch("finance.matcher.PARALLEL_MIN_ROWS", 1)
+    mocker.patch("finance.matcher.WORKERS", 2)
+    executor = mocker.patch("finance.matcher.ProcessPoolExecutor", wraps=m.ProcessPoolExecutor)
+    assert ix.TokenIndex(DETAILS).match(matcher) == matcher.match(DETAILS)
+    assert executor.called
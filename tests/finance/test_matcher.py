@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import finance.matcher as m
+
+
+def test_get_pattern_type():
+    # it should use literal type by default
+    assert m.get_pattern_type(np.nan) == "Literal"
+    assert m.get_pattern_type("") == "Literal"
+    assert m.get_pattern_type("Regex") == "Regex"
+    # it should throw error for unknown type
+    with pytest.raises(ValueError) as context_info:
+        m.get_pattern_type("Glob")
+    assert "Invalid pattern type 'Glob'" in str(context_info.value)
+
+
+def test_check_regex():
+    # it should accept safe patterns
+    for pattern in ["^AMZN", "Uber( Eats)?", "[0-9]+ Market", "(ab){2,5}"]:
+        assert m.check_regex(pattern) is None
+    # it should reject nested repeats and back-references
+    for pattern in ["(a+)+", "(a*)*b", "(?:x|y+)*", "(a)\\1"]:
+        with pytest.raises(ValueError) as context_info:
+            m.check_regex(pattern)
+        assert "Unsafe regex pattern" in str(context_info.value)
+    # it should reject invalid patterns
+    with pytest.raises(ValueError) as context_info:
+        m.check_regex("Market(")
+    assert "Invalid regex pattern" in str(context_info.value)
+
+
+def test_pattern_matcher():
+    details = ["Food from Walmart", "AMZN Marketplace", "Uber Eats", "Uber"]
+    # it should match literal patterns
+    matcher = m.PatternMatcher(["Walmart", "Market", "Uber"])
+    assert matcher.match(details) == [[0], [1], [2], [2]]
+    # it should match whole words only
+    matcher = m.PatternMatcher(["Market", "Uber"], ["Word", "Word"])
+    assert matcher.match(details) == [[], [], [1], [1]]
+    # it should match regex patterns
+    matcher = m.PatternMatcher(["^Uber$", "(?i)market"], ["Regex", "Regex"])
+    assert matcher.match(details) == [[], [1], [], [0]]
+    # it should return same matches for any group size
+    patterns = ["Food", "Uber", "^U", "Eats$", "Walmart"]
+    types = ["Literal", "Word", "Regex", "Regex", "Literal"]
+    expected = [[0, 4], [], [1, 2, 3], [1, 2]]
+    for group_size in [1, 2, 5]:
+        matcher = m.PatternMatcher(patterns, types, group_size)
+        assert matcher.match(details) == expected
+    # it should not match missing values
+    assert matcher.match([np.nan]) == [[]]
+
+
+def test_resolve_categories():
+    priorities = [1, 1, 2, 2]
+    categories = ["Food", "Food", "Shop", "Misc"]
+    # it should pick the last matching pattern with highest priority
+    winners, conflicts = m.resolve_categories([[0, 1], [1, 2], []], priorities, categories)
+    assert list(winners) == [1, 2, -1]
+    assert conflicts == []
+    # it should report colliding categories with same priority
+    winners, conflicts = m.resolve_categories([[0, 2, 3]], priorities, categories)
+    assert list(winners) == [-1]
+    assert conflicts == [(3, 0)]
+
+
+def test_match_index(tmp_path):
+    df_cat = pd.DataFrame(
+        data={
+            "CategoryName": ["Shopping", "Groceries", "Misc", "Misc"],
+            "Pattern": ["Amazon", "Food", "Other", "Unused"],
+            "Priority": [1, 2, 1, 1],
+        }
+    )
+    details = ["Amazon", "Food from Amazon", "Amazon Other"]
+    matches = m.PatternMatcher.from_frame(df_cat).match(details)
+    index = m.MatchIndex(details, df_cat, matches)
+    # it should return matching patterns per row
+    assert index.get_patterns(1) == [0, 1]
+    assert list(index.explain(1)["Winner"]) == [False, True]
+    # it should count hits and wins per pattern
+    df_hits = index.get_hit_counts()
+    assert list(df_hits["Hits"]) == [3, 1, 1, 0]
+    assert list(df_hits["Wins"]) == [1, 1, 0, 0]
+    assert list(index.get_unused_patterns()["Pattern"]) == ["Unused"]
+    assert list(index.get_shadowed_patterns()["Pattern"]) == ["Other"]
+    # it should list colliding patterns
+    df_conflicts = index.get_conflicts()
+    assert list(df_conflicts["Row"]) == [2, 2]
+    assert list(df_conflicts["Pattern"]) == ["Amazon", "Other"]
+    # it should save and load index
+    f_path = tmp_path / "matches.npz"
+    index.save(f_path)
+    index_loaded = m.MatchIndex.load(f_path)
+    assert index_loaded.details == details
+    assert index_loaded.get_hit_counts()["Hits"].equals(df_hits["Hits"])
+    assert index_loaded.conflicts == index.conflicts
+
+
+def test_pattern_matcher_details():
+    details = [
+        "2023-01-02 Rent",
+        "2023-01-02 Rent payment",
+        "2023-01-03 Refund of 2023-01-02 Rent",
+        "2023-01-03 Rent",
+    ]
+    patterns = ["2023-01-02 Rent", "Rent", "2023-01-03 Rent"]
+    # it should match details patterns like any other literal
+    matcher = m.PatternMatcher(patterns)
+    assert matcher.details == {"2023-01-02 ": [0], "2023-01-03 ": [2]}
+    assert matcher.match(details) == [[0, 1], [0, 1], [0, 1], [1, 2]]
+    # it should look up texts equal to a details pattern without a date scan
+    assert matcher.exact == {"2023-01-02 Rent": [0], "2023-01-03 Rent": [2]}
+    assert matcher.match(["2023-01-03 Rent bonus"]) == [[1, 2]]
+    # it should not accept exact as a pattern type
+    with pytest.raises(ValueError) as context_info:
+        m.PatternMatcher(patterns, ["Exact", "Literal", "Literal"])
+    assert "Invalid pattern type 'Exact'" in str(context_info.value)
+
+
+def test_match_parallel(mocker):
+    matcher = m.PatternMatcher(["Coffee", "Rent", "^Shop\\d+$", "Coffee Shop"], ["Literal", "Word", "Regex", "Literal"])
+    details = ["Coffee Shop", "Rent", "Shop42", "Coffees", "Rental", None, "My Coffee"] * 3
+    # it should match serially below the row limit
+    assert m.match_parallel(matcher, details, workers=2) == matcher.match(details)
+    # it should match shards in worker processes in the original order
+    mocker.patch("finance.matcher.PARALLEL_MIN_ROWS", 1)
+    assert m.match_parallel(matcher, details, workers=2) == matcher.match(details)
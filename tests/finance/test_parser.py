@@ -23,6 +23,9 @@ def test_parser_init():
     # it should create with default currency
     parser = prs.Parser(2012, "file")
     assert parser.currency == "USD"
+    # it should share the account of re-downloaded files
+    parser = prs.Parser(2012, "file (2).csv")
+    assert parser.account_name == "file"
 
 
 def test_parser_read(tmp_path, mocker):
@@ -40,6 +43,21 @@ def test_parser_read(tmp_path, mocker):
     assert parser.read().equals(DF)
 
 
+def test_parser_read_columns(tmp_path, mocker):
+    f_path_csv = tmp_path / "input.csv"
+    f_path_csv.write_text(
+        ' Transaction Date,"  Posted Date",Card No.,Description,Debit,Credit\n'
+        "2012-01-02,2012-01-03,0951,Coffee,1.5,\n"
+    )
+    mocker.patch("finance.functions.get_path", return_value=str(f_path_csv))
+    parser = prs.CapitalOneParser(2012, "file.csv")
+    df = parser.read()
+    # it should only read the planned columns & rename them
+    assert list(df.columns) == ["Date", "Details", "Debit", "Credit"]
+    assert df.loc[0, "Date"] == "2012-01-03"
+    assert df.loc[0, "Details"] == "Coffee"
+
+
 def test_parser_transform(mocker):
     mocker.patch("finance.dataframe.add_column", return_value=DF)
     mocker.patch("finance.dataframe.format_date", return_value=DF)
@@ -96,7 +114,7 @@ def test_parser_equal():
     assert parser1 != parser5
 
 
-def test_parser_validate():
+def test_parser_validate(capsys):
     parser = prs.Parser(2013, "file")
     cols = ["Date", "Account", "Amount", "Currency", "Details"]
     df_empty = pd.DataFrame(columns=cols)
@@ -131,6 +149,14 @@ def test_parser_validate():
     with pytest.raises(ValueError) as context_info:
         parser.validate(df_year)
     assert "Invalid year 2012 found" in str(context_info.value)
+    # it should print a short summary of the violations
+    capsys.readouterr()
+    df_many = pd.DataFrame([[np.nan, 1, 2, 3, 4]] * 8, columns=cols)
+    with pytest.raises(ValueError):
+        parser.validate(df_many)
+    output = capsys.readouterr().out
+    assert "Violations in file" in output
+    assert "missing  Date        8  0, 1, 2, 3, 4, ..." in output
     # it should return None if no column is missing and date is correct
     df_correct = df.copy()
     df_correct.loc[0, "Date"] = dt.date(2013, 12, 1)
@@ -211,22 +237,128 @@ class MockObj:
         return DF
 
 
+def test_detect_parser_class(tmp_path, mocker, capsys):
+    def write_file(file_name: str, header: str) -> str:
+        f_path = tmp_path / file_name
+        f_path.write_text(header + "\n01/03/2012,Rent,1,1\n")
+        return str(f_path)
+
+    mocker.patch.dict("finance.parser.FINGERPRINTS", clear=True)
+    # it should detect the format of a misnamed file by its header
+    f_path = write_file("statement.csv", '"  Date",Details,Amount,Balance')
+    mocker.patch("finance.functions.get_path", return_value=f_path)
+    parser = prs.get_parser_object(2012, "statement.csv")
+    assert type(parser) == prs.HSBCParser
+    assert parser.account_name == "statement"
+    # it should keep the parser of a known file name & warn about the header
+    f_path = write_file("HSBC_Checking.csv", " Date,Details,Amount")
+    mocker.patch("finance.functions.get_path", return_value=f_path)
+    capsys.readouterr()
+    assert type(prs.get_parser_object(2012, "HSBC_Checking.csv")) == prs.HSBCParser
+    assert "has a HSBCMasterCardParser header, parsed as HSBCParser" in capsys.readouterr().out
+    # it should detect formats with extra columns by the most specific format
+    f_path = write_file("export.csv", "Date,Amount,Currency,Details,Note,")
+    assert prs.detect_parser_class(f_path) == prs.Parser
+    # it should fall back to the file name if the header is ambiguous
+    f_path = write_file("HSBC_Mastercard.csv", "Date,Details,Amount,Note")
+    mocker.patch("finance.functions.get_path", return_value=f_path)
+    assert prs.detect_parser_class(f_path) is None
+    assert type(prs.get_parser_object(2012, "HSBC_Mastercard.csv")) == prs.HSBCMasterCardParser
+    # it should cache the parser class per header
+    mocker.patch("finance.parser.match_parser_class")
+    f_path = write_file("other.csv", "Date,Details,Amount,Balance")
+    assert prs.detect_parser_class(f_path) == prs.HSBCParser
+    prs.match_parser_class.assert_not_called()
+
+
 def test_parse_transaction_file(mocker):
     # it should parse transaction file
     mocker.patch("finance.parser.get_parser_object", return_value=MockObj)
     assert prs.parse_transaction_file(2033, "file.txt").equals(DF)
 
 
+def get_transactions(account: str, rows: list) -> pd.DataFrame:
+    return pd.DataFrame(
+        [[dt.date(2023, 1, day), account, amount, "USD", details] for day, amount, details in rows],
+        columns=prs.Parser.col_names,
+    )
+
+
 def test_parse_transactions(mocker):
-    mocker.patch("finance.parser.parse_transaction_file", return_value=DF)
+    df1 = get_transactions("Bank", [(1, 1.0, "a")])
+    df2 = get_transactions("Card", [(1, 1.0, "a")])
+    mocker.patch("finance.parser.get_parser_object", return_value=None)
+    mocker.patch(
+        "finance.parser.parse_file",
+        side_effect=[
+            (df, {"File": file_name, "ReadTime": 0.5})
+            for df, file_name in [(df1, "f1"), (df1, "f1"), (df2, "f2"), (df1, "f1")]
+        ],
+    )
     # it should parse single file
     mocker.patch(
         "finance.functions.get_transaction_files", return_value=["f1"]
     )
-    assert prs.parse_transactions(2003).equals(DF)
-    # it should parse multiple files
+    assert prs.parse_transactions(2003).equals(df1)
+    # it should report every parsed file
+    mocker.patch(
+        "finance.functions.get_transaction_files", return_value=["f1"]
+    )
+    df, df_report = prs.parse_transactions_with_report(2003)
+    assert df.equals(df1)
+    assert list(df_report["File"]) == ["f1"]
+    # it should parse multiple files & flag slow files
     mocker.patch(
-        "finance.functions.get_transaction_files", return_value=["f1", "f2"]
+        "finance.functions.get_transaction_files", return_value=["f2", "f1"]
     )
-    df_appended = DF.copy().append(DF, ignore_index=True)
-    assert prs.parse_transactions(2004).equals(df_appended)
+    df, df_report = prs.parse_transactions_with_report(2004, slow_seconds=0.1)
+    assert df.equals(pd.concat([df2, df1]))
+    assert list(df_report["Slow"]) == [True, True]
+
+
+def test_parse_file(tmp_path, mocker):
+    f_path = tmp_path / "HSBC_Checking.csv"
+    f_path.write_text(' Date,Details,Amount,Balance\n01/03/2012,"  Payroll",1,1\n01/04/2012,Rent,-2,1\n')
+    mocker.patch("finance.functions.get_path", return_value=str(f_path))
+    parser = prs.get_parser_object(2012, "HSBC_Checking.csv")
+    df, report = prs.parse_file(parser)
+    # it should parse the file
+    assert list(df["Details"]) == ["2012-01-03 Payroll", "2012-01-04 Rent"]
+    # it should report the file
+    assert report["Parser"] == "HSBCParser"
+    assert report["Bytes"] == f_path.stat().st_size
+    assert (report["RowsIn"], report["RowsOut"]) == (2, 2)
+    assert report["ReadTime"] > 0 and report["TransformTime"] > 0
+    assert report["FrameBytesIn"] > 0
+    df_report = prs.get_report([report])
+    assert list(df_report.columns) == prs.COLS_REPORT
+    assert not df_report.loc[0, "Slow"]
+
+
+def test_drop_duplicate_transactions():
+    df1 = get_transactions("Bank", [(1, 1.0, "a"), (1, 1.0, "a"), (2, 2.0, "b")])
+    df2 = get_transactions("Bank", [(2, 2, "b"), (1, 1.0, "a"), (3, 3.0, "c")])
+    df3 = get_transactions("Bank", [(1, 1.0, "a"), (1, 1.0, "a"), (1, 1.0, "a")])
+    # it should keep identical transactions within a file
+    df, df_removed = prs.drop_duplicate_transactions([df1], ["f1"])
+    assert df.equals(df1)
+    assert df_removed.empty
+    # it should drop rows already found in an overlapping file
+    df, df_removed = prs.drop_duplicate_transactions([df1, df2], ["f1", "f2"])
+    assert df.equals(pd.concat([df1, df2.iloc[[2]]]))
+    assert list(df_removed["File"]) == ["f2", "f2"]
+    assert list(df_removed["Details"]) == ["b", "a"]
+    # it should keep extra occurrences of a repeated transaction
+    df, df_removed = prs.drop_duplicate_transactions([df1, df3], ["f1", "f3"])
+    assert df.equals(pd.concat([df1, df3.iloc[[2]]]))
+    assert len(df_removed.index) == 2
+    # it should not drop transactions of different accounts
+    df_other = df1.assign(Account="Card")
+    df, df_removed = prs.drop_duplicate_transactions([df1, df_other], ["f1", "f2"])
+    assert len(df.index) == 6
+    assert df_removed.empty
+    # it should not drop transactions of different currencies
+    df_eur = df1.assign(Currency="EUR")
+    df, df_removed = prs.drop_duplicate_transactions([df1, df_eur], ["f1", "f2"])
+    assert len(df.index) == 6
+    assert df_removed.empty
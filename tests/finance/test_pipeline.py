@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+import finance.pipeline as pl
+
+
+class MockParser:
+    def __init__(self, year: int, file_name: str):
+        self.file_name = file_name
+
+    def get_path(self):
+        return self.file_name
+
+    def read(self):
+        if self.file_name == "broken.csv":
+            raise ValueError("Cannot read file")
+        return pd.DataFrame(data={"File": [self.file_name]})
+
+    @staticmethod
+    def transform(df):
+        return df
+
+    @staticmethod
+    def validate(df):
+        return None
+
+
+def test_parse_transactions(mocker):
+    mocker.patch("finance.parser.get_parser_object", side_effect=MockParser)
+    # it should parse files in order
+    files = ["f1.csv", ".~lock.f1.csv#", "f2.csv", "f3.csv"]
+    mocker.patch("finance.functions.get_transaction_files", return_value=files)
+    df, df_report = asyncio.run(pl.parse_transactions(2003, prefetch=1))
+    assert list(df["File"]) == ["f1.csv", "f2.csv", "f3.csv"]
+    # it should report every parsed file
+    assert list(df_report["File"]) == ["f1.csv", "f2.csv", "f3.csv"]
+    assert list(df_report["Parser"]) == ["MockParser"] * 3
+    assert list(df_report["RowsOut"]) == [1, 1, 1]
+    assert not df_report["Slow"].any()
+    # it should throw read errors
+    files = ["f1.csv", "broken.csv", "f3.csv"]
+    mocker.patch("finance.functions.get_transaction_files", return_value=files)
+    with pytest.raises(ValueError) as context_info:
+        asyncio.run(pl.parse_transactions(2003))
+    assert "Cannot read file" in str(context_info.value)
+    # it should return empty dataframe if there is no file
+    mocker.patch("finance.functions.get_transaction_files", return_value=[])
+    df, df_report = asyncio.run(pl.parse_transactions(2003))
+    assert df.empty
+    assert df_report.empty
@@ -135,3 +135,72 @@ def test_summarize_months(mocker):
     mocker.patch("finance.report.summarize_categories", return_value=DF)
     assert rpt.summarize_months(2019, DF)[0].equals(DF)
     assert rpt.summarize_months(2019, DF)[1].equals(DF)
+
+
+def test_summarize_pnl(mocker, tmp_path):
+    df = pd.DataFrame(
+        data={
+            "CategoryType": ["Costs", "Costs", "Costs", "Costs"],
+            "CategoryName": ["Food", "Savings Bond", "Rent", "Food"],
+            "Month": [1, 1, 2, 2],
+            "AmountUSD": [-10, -100, -50, -30],
+        }
+    )
+    # it should group categories by their prefix (LivingExpense by default)
+    df_avg = rpt.summarize_pnl(df.copy())
+    assert df_avg.index.names == ["CategoryType", "LivingExpense", "CategoryName"]
+    assert df_avg.loc[("Costs", True, "Food"), "AmountUSD"] == 20
+    assert df_avg.loc[("Costs", False, "Savings Bond"), "AmountUSD"] == 50
+    # it should read any number of groupings from the settings
+    mocker.patch(
+        "finance.functions.get_path",
+        side_effect=lambda year, folder, file_name: tmp_path / file_name,
+    )
+    assert rpt.read_category_groups(2019) == rpt.DEFAULT_CATEGORY_GROUPS
+    (tmp_path / "category_groups.csv").write_text(
+        "Grouping,Prefix,Group\nLivingExpense,Savings,False\nLivingExpense,,True\nKind,Rent,Fixed\nKind,Food,Discretionary\n"
+    )
+    df_avg = rpt.summarize_pnl(df.copy(), rpt.read_category_groups(2019))
+    assert df_avg.index.names == ["CategoryType", "LivingExpense", "Kind", "CategoryName"]
+    assert list(df_avg.index) == [
+        ("Costs", False, "", "Savings Bond"),
+        ("Costs", True, "Discretionary", "Food"),
+        ("Costs", True, "Fixed", "Rent"),
+    ]
+
+
+def test_get_balance_sheets(mocker):
+    df_acc = pd.DataFrame(
+        data={
+            "AccountType": ["Assets", "Assets"],
+            "AccountCategory": ["Current_Assets", "Current_Assets"],
+            "Account": ["Bank", "Cash"],
+            "Currency": ["USD", "HUF"],
+            "InitialBalance": [100, 3000],
+        }
+    )
+    mocker.patch("finance.dataframe.parse_csv", return_value=df_acc)
+    fx_rates = {"HUF": 1, "USD": 300}
+    df = DF_ACC.assign(Currency=["USD", "USD", "USD"])
+    df_sheets = rpt.get_balance_sheets(2019, df, fx_rates)
+    # it should return the end of month balance of every account
+    assert len(df_sheets.index) == 24
+    bank = df_sheets[df_sheets["Account"] == "Bank"].set_index("Month")
+    assert list(bank["Balance"][[2, 3, 5, 6, 12]]) == [100, 200, 200, 400, 400]
+    # it should revalue the balances in every currency
+    assert bank.loc[6, "USD"] == 400
+    assert bank.loc[6, "HUF"] == 120000
+    cash = df_sheets[df_sheets["Account"] == "Cash"].set_index("Month")
+    assert cash.loc[1, "USD"] == 10
+    # it should consolidate the balances by account type & category
+    df_cons = rpt.consolidate_balance_sheets(df_sheets)
+    assert list(df_cons.columns) == ["Month", "AccountType", "AccountCategory", "HUF", "USD"]
+    assert df_cons.loc[df_cons["Month"] == 6, "USD"].item() == 410
+    # it should throw error if the account is unknown
+    with pytest.raises(ValueError) as context_info:
+        rpt.get_balance_sheets(2019, df.assign(Account="Other"), fx_rates)
+    assert "Account 'Other' (USD) not found" in str(context_info.value)
+    # it should throw error if the FX rate is missing
+    with pytest.raises(ValueError) as context_info:
+        rpt.get_balance_sheets(2019, df, {"USD": 1})
+    assert "No FX rate found for 'HUF'" in str(context_info.value)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+import datetime as dt
+import json
+import os.path
+import shutil
+import threading
+import urllib.request
+
+import finance.matcher as m
+import finance.session as s
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+
+
+def get_session(tmp_path, monkeypatch) -> s.FinanceSession:
+    shutil.copytree(DATA, tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+    return s.FinanceSession(2023)
+
+
+def test_finance_session(tmp_path, monkeypatch):
+    session = get_session(tmp_path, monkeypatch)
+    # it should answer queries from the parsed transactions
+    assert session.get_balance("Cash", "USD", dt.date(2023, 1, 31)) == -1
+    assert session.get_balance("Cash", "USD") == -2
+    assert list(session.search("Walmart")["Account"]) == ["Cash", "HSBC_Mastercard"]
+    uncategorized = len(session.get_uncategorized().index)
+    df_totals = session.get_category_totals()
+    assert list(df_totals.columns) == ["CategoryType", "CategoryName", "AmountUSD"]
+    # it should not re-run stages if nothing changed
+    assert session.refresh() == set()
+    # it should re-run stages of changed files
+    cash = tmp_path / "data" / "2023" / "input" / "Cash.csv"
+    cash.write_text(cash.read_text(encoding="utf-8-sig") + "\n2023-03-01,-5,USD,Unknown shop\n", encoding="utf-8")
+    assert session.get_balance("Cash", "USD") == -7
+    df_uncategorized = session.get_uncategorized()
+    assert len(df_uncategorized.index) == uncategorized + 1
+    assert "2023-03-01 Unknown shop" in list(df_uncategorized["Details"])
+    assert list(session.search("Unknown")["Amount"]) == [-5]
+
+
+def test_finance_session_parallel(tmp_path, monkeypatch, mocker):
+    # it should categorize in worker processes like serially
+    expected = get_session(tmp_path / "serial", monkeypatch).get_transactions()
+    mocker.patch("finance.matcher.PARALLEL_MIN_ROWS", 1)
+    mocker.patch("finance.matcher.WORKERS", 2)
+    executor = mocker.patch("finance.matcher.ProcessPoolExecutor", wraps=m.ProcessPoolExecutor)
+    assert get_session(tmp_path / "parallel", monkeypatch).get_transactions().equals(expected)
+    assert executor.called
+
+
+def test_serve(tmp_path, monkeypatch):
+    server = s.get_server(get_session(tmp_path, monkeypatch), "127.0.0.1:0")
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        # it should answer queries as json
+        with urllib.request.urlopen(f"{url}/balance?account=Cash&currency=USD&date=2023-01-31") as response:
+            assert json.loads(response.read()) == {"balance": -1.0}
+        with urllib.request.urlopen(f"{url}/search?text=Walmart") as response:
+            assert [row["Account"] for row in json.loads(response.read())] == ["Cash", "HSBC_Mastercard"]
+        # it should return errors as json
+        try:
+            urllib.request.urlopen(f"{url}/balance?account=Cash")
+            assert False
+        except urllib.error.HTTPError as e:
+            assert e.code == 400
+            assert "currency" in json.loads(e.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
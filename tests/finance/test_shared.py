@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+import datetime as dt
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import finance.shared as sh
+
+DF = pd.DataFrame(
+    data={
+        "Date": [dt.date(2023, 1, 1), dt.date(2023, 1, 2), dt.date(2023, 1, 2)],
+        "Amount": [1.5, -2.0, np.nan],
+        "Priority": [1, 2, 3],
+        "Details": ["2023-01-01 Coffee", "2023-01-02 Rent", None],
+        "Comment": [None, "paid", 3],
+    },
+    index=[3, 1, 0],
+)
+
+
+def test_shared_frame():
+    with sh.SharedFrame.publish(DF) as frame:
+        # it should pickle the handle only
+        handle = pickle.dumps(frame)
+        assert len(handle) < 1000
+        attached = pickle.loads(handle)
+        assert not attached.owner
+        # it should attach to the frame with the same values & types
+        df = attached.to_frame()
+        pd.testing.assert_frame_equal(df, DF)
+        assert isinstance(df.loc[3, "Date"], dt.date)
+        assert df.loc[3, "Comment"] is None
+        # it should use numeric columns in place (read-only)
+        block = np.frombuffer(attached.shm.buf, dtype=np.uint8)
+        assert np.shares_memory(df["Amount"].to_numpy(), block)
+        assert not df["Amount"].to_numpy().flags.writeable
+        # it should only attach selected columns
+        assert list(attached.to_frame(["Priority"]).columns) == ["Priority"]
+        del df, block
+        attached.close()
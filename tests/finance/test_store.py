@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import finance.store as st
+
+DF = pd.DataFrame(
+    data={
+        "Date": [dt.date(2023, 1, 1), dt.date(2023, 1, 2)],
+        "Amount": [1.5, -2.0],
+        "Details": ["2023-01-01 Coffee", "2023-01-02 Rent"],
+        "Comment": [np.nan, "paid"],
+    },
+    index=[3, 1],
+)
+
+
+def test_save_frame(tmp_path):
+    f_path = str(tmp_path / "transactions.arrow")
+    st.save_frame(DF, f_path)
+    # it should load the frame with the same values & types
+    df = st.load_frame(f_path)
+    pd.testing.assert_frame_equal(df, DF.reset_index(drop=True))
+    assert isinstance(df.loc[0, "Date"], dt.date)
+    # it should only load selected columns
+    assert list(st.load_frame(f_path, columns=["Amount"]).columns) == ["Amount"]
+    # it should load a memory-mapped arrow table
+    table = st.load_table(f_path)
+    assert table.num_rows == 2
+    assert table.column("Amount").to_pylist() == [1.5, -2.0]
+    # it should store mixed object columns as text
+    df_mixed = DF.assign(Comment=[1, "paid"])
+    st.save_frame(df_mixed, f_path)
+    assert list(st.load_frame(f_path)["Comment"]) == ["1", "paid"]
+
+
+def test_save_transactions(tmp_path, mocker):
+    mocker.patch("finance.functions.get_path", return_value=str(tmp_path / "transactions.arrow"))
+    # it should save & load the transactions of the year
+    st.save_transactions(DF, 2023)
+    pd.testing.assert_frame_equal(st.load_transactions(2023), DF.reset_index(drop=True))
+
+
+def test_save_excel(tmp_path):
+    import openpyxl
+
+    f_path = str(tmp_path / "transactions.xlsx")
+    st.save_excel(DF, f_path, chunk_size=1, column_widths={"Details": 40}, auto_filter=True)
+    # it should write the same values as to_excel
+    f_path_pandas = str(tmp_path / "pandas.xlsx")
+    DF.to_excel(f_path_pandas, index=False)
+    pd.testing.assert_frame_equal(pd.read_excel(f_path), pd.read_excel(f_path_pandas))
+    # it should set column widths & the auto-filter
+    ws = openpyxl.load_workbook(f_path).active
+    assert ws.column_dimensions["C"].width == 40
+    assert ws.auto_filter.ref == "A1:D3"
+
+
+def test_save_side_outputs(tmp_path):
+    f_path = str(tmp_path / "transactions.xlsx")
+    # it should write csv & parquet copies next to the export
+    f_paths = st.save_side_outputs(DF, f_path, ["csv", "parquet"])
+    assert f_paths == [str(tmp_path / "transactions.csv"), str(tmp_path / "transactions.parquet")]
+    assert list(pd.read_csv(f_paths[0])["Details"]) == list(DF["Details"])
+    assert list(pd.read_parquet(f_paths[1])["Amount"]) == list(DF["Amount"])
+    # it should throw error for unknown formats
+    with pytest.raises(ValueError) as context_info:
+        st.save_side_outputs(DF, f_path, ["json"])
+    assert "Invalid output format 'json'" in str(context_info.value)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+import pytest
+
+import finance.table as tb
+
+
+def get_table() -> tb.Table:
+    table = tb.Table("Balances", ["Account", "Amount"], {"Amount": ".2f"})
+    table.add("Bank", 1.5)
+    table.extend({"Account": ["Cash|Box"], "Amount": [float("nan")]})
+    return table
+
+
+def test_table_render():
+    table = get_table()
+    assert len(table) == 2
+    # it should align text left & numbers right
+    assert table.render() == "Balances:\nAccount   Amount\nBank        1.50\nCash|Box\n"
+    # it should render markdown & html tables
+    assert table.render("markdown").splitlines()[2:] == [
+        "| Account | Amount |",
+        "|---|---:|",
+        "| Bank | 1.50 |",
+        "| Cash\\|Box |  |",
+    ]
+    assert "<tr><td>Bank</td><td>1.50</td></tr>" in table.render("html")
+    # it should throw error if the format is unknown
+    with pytest.raises(ValueError) as context_info:
+        table.render("pdf")
+    assert "Invalid output format 'pdf'" in str(context_info.value)
+
+
+def test_table_show(tmp_path, capsys, mocker):
+    table = get_table()
+    # it should print the table at once
+    table.show()
+    assert capsys.readouterr().out == table.render()
+    # it should append the table to the report file
+    f_path = str(tmp_path / "report.md")
+    table.show(quiet=True, report_path=f_path)
+    table.show(quiet=True, report_path=f_path)
+    assert capsys.readouterr().out == ""
+    with open(f_path, encoding="utf-8") as file:
+        assert file.read() == 2 * (table.render("markdown") + "\n")
+    # it should not format anything in quiet mode without a report file
+    format_column = mocker.patch("finance.table.format_column")
+    table.show(quiet=True)
+    format_column.assert_not_called()
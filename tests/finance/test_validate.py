@@ -186,3 +186,45 @@ def test_(tmp_path, mocker):
     f_path.write_text(json.dumps(FX_RATES))
     mocker.patch("finance.functions.get_path", return_value=f_path)
     assert v.get_fx_rates(2016) == FX_RATES
+
+
+def test_check_settings(tmp_path, mocker):
+    def write_settings(accounts: str, balances: str):
+        (tmp_path / "accounts.csv").write_text(accounts)
+        (tmp_path / "balances.csv").write_text(balances)
+
+    (tmp_path / "fx_rates.json").write_text(json.dumps(FX_RATES))
+    mocker.patch(
+        "finance.functions.get_path",
+        side_effect=lambda year, folder, file_name: tmp_path / file_name,
+    )
+    accounts = "Account,Currency,InitialBalance\nBank,USD,0\n"
+    # it should accept valid settings
+    write_settings(accounts, " Date,Account,Balance,Currency,Adjustment\n2016-01-31,Bank,10,USD,\n")
+    v.check_settings(2016)
+    # it should throw error if a column is missing
+    write_settings(accounts, "Date,Account,Balance,Currency\n2016-01-31,Bank,10,USD\n")
+    with pytest.raises(ValueError) as context_info:
+        v.check_settings(2016)
+    assert "Column 'Adjustment' not found!" in str(context_info.value)
+    # it should throw error if a value is missing
+    write_settings(accounts, "Date,Account,Balance,Currency,Adjustment\n2016-01-31,Bank,,USD,\n")
+    with pytest.raises(ValueError) as context_info:
+        v.check_settings(2016)
+    assert "Missing values found in column 'Balance'" in str(context_info.value)
+    # it should throw error if the account is unknown
+    write_settings(accounts, "Date,Account,Balance,Currency,Adjustment\n2016-01-31,Other,10,USD,\n")
+    with pytest.raises(ValueError) as context_info:
+        v.check_settings(2016)
+    assert "Account 'Other' (USD) not found" in str(context_info.value)
+    # it should throw error if the FX rate is missing
+    write_settings("Account,Currency,InitialBalance\nBank,GBP,0\n", "Date,Account,Balance,Currency,Adjustment\n")
+    with pytest.raises(ValueError) as context_info:
+        v.check_settings(2016)
+    assert "No FX rate found for 'GBP'" in str(context_info.value)
+    # it should throw error if a category grouping is missing
+    write_settings(accounts, "Date,Account,Balance,Currency,Adjustment\n")
+    (tmp_path / "category_groups.csv").write_text("Grouping,Prefix,Group\n,Savings,False\n")
+    with pytest.raises(ValueError) as context_info:
+        v.check_settings(2016)
+    assert "Missing values found in column 'Grouping'" in str(context_info.value)
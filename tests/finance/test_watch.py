@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+import os
+
+import pandas as pd
+
+import finance.dag as dag
+import finance.watch as w
+
+
+def get_stages(calls: list) -> list:
+    def stage(name: str):
+        def run(year, artifacts):
+            calls.append(name)
+            if name == "broken":
+                raise ValueError("Stage error")
+            return name
+
+        return run
+
+    return [
+        dag.Stage("read", stage("read"), files=[("input", None)]),
+        dag.Stage("settings", stage("settings"), files=[("settings", "fx.json")]),
+        dag.Stage("broken", stage("broken"), files=[("settings", "fx.json")], upstream=["read"]),
+        dag.Stage("report", stage("report"), upstream=["read", "settings"]),
+        dag.Stage("parse", stage("parse")),
+    ]
+
+
+def test_watcher(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for folder in ["input", "settings", "output"]:
+        os.makedirs(tmp_path / "data" / "2020" / folder)
+    (tmp_path / "data" / "2020" / "settings" / "fx.json").write_text("{}")
+    calls = []
+    watcher = w.Watcher(2020, get_stages(calls))
+    watcher.stages["parse"] = get_stages(calls)[-1]
+    # it should run every stage first
+    watcher.update()
+    assert sorted(calls) == ["broken", "parse", "read", "report", "settings"]
+    # it should not retry failed stages if nothing changed
+    calls.clear()
+    assert watcher.update() == set()
+    assert calls == []
+    assert watcher.dirty == {"broken"}
+    # it should run stages reading a new file & downstream stages only
+    calls.clear()
+    (tmp_path / "data" / "2020" / "input" / "Cash.csv").write_text("Date")
+    watcher.update()
+    assert sorted(calls) == ["broken", "read", "report"]
+
+
+def test_watcher_broken_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for folder in ["input", "settings", "output"]:
+        os.makedirs(tmp_path / "data" / "2020" / folder)
+    f_path = tmp_path / "data" / "2020" / "input" / "Cash.xlsx"
+    df = pd.DataFrame(data={"Date": ["2020-01-02"], "Amount": [-1], "Currency": ["USD"], "Details": ["Coffee"]})
+    df.to_excel(f_path, index=False)
+    content = f_path.read_bytes()
+    # partially copied file
+    f_path.write_bytes(content[: len(content) // 2])
+    stages = [
+        dag.Stage("parse", None, files=[("input", None)]),
+        dag.Stage("count", lambda year, artifacts: len(artifacts["parse"].index), upstream=["parse"]),
+    ]
+    watcher = w.Watcher(2020, stages)
+    # it should keep watching & mark the stage and its downstream stages dirty
+    assert watcher.update() == {"parse", "count"}
+    assert watcher.dirty == {"parse", "count"}
+    # it should retry the stages once the file is complete
+    f_path.write_bytes(content)
+    os.utime(f_path, ns=(1, 1))
+    watcher.update()
+    assert watcher.dirty == set()
+    assert watcher.artifacts["count"] == 1
+
+
+def test_watcher_outputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for folder in ["input", "settings", "output"]:
+        os.makedirs(tmp_path / "data" / "2020" / folder)
+    f_output = tmp_path / "data" / "2020" / "output" / "transactions.xlsx"
+    calls = []
+
+    def export(year, artifacts):
+        # writes the file it reads categories from, then fails
+        calls.append("export")
+        f_output.write_text(str(len(calls)))
+        raise ValueError("Missing categories found")
+
+    stages = [
+        dag.Stage("parse", None, files=[("input", None)]),
+        dag.Stage("categories", lambda year, artifacts: calls.append("categories"), files=[("output", "transactions.xlsx")]),
+        dag.Stage("export", export, upstream=["parse", "categories"], outputs=[("output", "transactions.xlsx")]),
+    ]
+    watcher = w.Watcher(2020, stages)
+    watcher.update()
+    assert calls == ["categories", "export"]
+    # it should not count files written by the stages as changes
+    calls.clear()
+    for _ in range(3):
+        watcher.update()
+    assert calls == []
+    # it should run the stages reading an output file the user edited
+    f_output.write_text("edited")
+    os.utime(f_output, ns=(1, 1))
+    watcher.update()
+    assert calls == ["categories", "export"]
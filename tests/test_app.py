@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+
+import os.path
+import runpy
+import sys
+
+APP = os.path.join(os.path.dirname(__file__), "..", "app.py")
+
+
+def test_app_import(mocker):
+    mocker.patch.object(sys, "argv", ["app.py", "--unknown"])
+    main = mocker.patch("finance.dag.DAG")
+    # it should not parse arguments or run stages when worker processes
+    # (spawn) import the main file
+    namespace = runpy.run_path(APP, run_name="__mp_main__")
+    assert callable(namespace["main"])
+    assert not main.called